@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover everything below it.
+    'LittleLemonAPI.middleware.PerformanceMiddleware',
+    'LittleLemonAPI.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -77,10 +81,35 @@ WSGI_APPLICATION = 'LittleLemon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent writers: WAL lets readers run alongside the
+# writer, IMMEDIATE transactions take the write lock up front so the busy
+# timeout applies instead of failing on a lock upgrade, and connections are
+# kept open across requests. Under ASGI, asgi.py turns persistent connections
+# off, since each request there may run its queries on a different thread.
+#
+# Unlike the pragmas below, journal_mode=WAL is stored in the database file,
+# so signals.py sets it on every SQLite file except DEV_DATABASE, the
+# development database checked into the repository, which using it (or
+# running the tests) would otherwise rewrite. Deployments point
+# DJANGO_DATABASE_PATH at their own database.
+DEV_DATABASE = BASE_DIR / 'db.sqlite3'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': Path(os.environ.get('DJANGO_DATABASE_PATH', DEV_DATABASE)),
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY'
+            ),
+        },
     }
 }
 
@@ -133,11 +162,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'LittleLemonAPI.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
         'rest_framework_xml.renderers.XMLRenderer',
     ],
@@ -148,8 +177,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 3,
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'LittleLemonAPI.throttles.AnonSlidingWindowThrottle',
+        'LittleLemonAPI.throttles.UserSlidingWindowThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '2/minute',
@@ -158,6 +187,47 @@ REST_FRAMEWORK = {
     },
 }
 
+# Opt in to the fast read path: orjson rendering and .values()-based
+# serializers for the menu item and order lists. Responses are byte-for-byte
+# the same either way. orjson is in the Pipfile; `manage.py check` warns when
+# this is on without it.
+FAST_JSON_RENDERING = False
+
+# CACHES is left at Django's default, a memory cache private to each worker
+# process. With several workers, configure a cache they all share (Redis,
+# Memcached): until then the menu catalog version is read from the database
+# on every menu request, roles are cached for seconds rather than minutes and
+# tokens only in each process's own short-lived LRU; see LittleLemonAPI/
+# cache.py, permissions.py and authentication.py.
+
+# Where the throttles keep their window counters. The SQLite file is shared by
+# every worker on this host; for several hosts, use
+# 'LittleLemonAPI.throttles.CacheCounterStore' with a shared cache alias.
+THROTTLE_STORE = {
+    'BACKEND': 'LittleLemonAPI.throttles.SQLiteCounterStore',
+    'OPTIONS': {'path': BASE_DIR / 'throttle.sqlite3'},
+}
+
+# Where carts live until checkout. DatabaseCartStore writes every change to
+# the Cart table. With a shared, non-evicting cache such as Redis configured
+# in CACHES, 'LittleLemonAPI.carts.CacheCartStore' (OPTIONS: alias, timeout)
+# keeps quantity changes and clears in the cache and writes them back at
+# checkout or after `timeout` idle seconds; run `manage.py flush_carts` more
+# often than that. It refuses to start on a per-process or evicting cache.
+CART_STORE = {
+    'BACKEND': 'LittleLemonAPI.carts.DatabaseCartStore',
+}
+
+# Opt-in request profiling and slow-query log; see LittleLemonAPI/profiling.py
+# for every option. Summarize the captures with `manage.py profile_report`.
+PROFILING = {
+    'ENABLED': os.environ.get('DJANGO_PROFILING') == '1',
+    'SAMPLE_RATE': 0.01,
+    'SLOW_REQUEST_MS': None,
+    'SLOW_QUERY_MS': 100,
+    'DIRECTORY': BASE_DIR / 'profiles',
+}
+
 DJOSER = {
     'USER_ID_FIELD': "username",
     'PERMISSIONS': {
@@ -0,0 +1,11 @@
+from django.urls import path
+from LittleLemonAPI import async_views
+
+# Async read-only twins of the routes in urls.py, mounted under /api/async/.
+urlpatterns = [
+    path('menu-items', async_views.MenuItemList.as_view()),
+    path('menu-items/', async_views.MenuItemsByCategoryView.as_view()),
+    path('menu-items/<int:pk>/', async_views.MenuItemDetailView.as_view()),
+    path('orders/', async_views.OrderView.as_view()),
+    path('orders/<int:pk>/', async_views.OrderDetailView.as_view()),
+]
@@ -0,0 +1,187 @@
+"""
+Async versions of the hot read endpoints, served under /api/async/.
+
+Each view subclasses its sync counterpart in views.py, so querysets,
+serializers, filters, pagination and permissions stay in one place; only
+the request cycle and the database reads are async. Writes stay on the sync
+views.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import aprefetch_related_objects
+from django.http import Http404
+from django.utils.text import slugify
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from LittleLemonAPI import views
+from LittleLemonAPI.cache import AsyncMenuCacheMixin
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.pagination import KeysetPagination
+from LittleLemonAPI.permissions import aget_roles
+
+
+class AsyncAPIViewMixin:
+    """
+    Runs APIView's request cycle as a coroutine.
+
+    Authenticators that provide aauthenticate() are awaited directly; any
+    others, and the throttles, run in a worker thread. Roles are loaded
+    before the permission checks, so those never block.
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+
+        await self.aperform_authentication(request)
+        await aget_roles(request.user)
+        self.check_permissions(request)
+        await sync_to_async(self.check_throttles)(request)
+
+    async def aperform_authentication(self, request):
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'aauthenticate', None) or sync_to_async(authenticator.authenticate)
+            try:
+                user_auth = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+            if user_auth is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                return
+        request._not_authenticated()
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if isinstance(self.paginator, KeysetPagination):
+            page = self.paginator.get_page_queryset(queryset, self.request, view=self)
+            if page is None:
+                return None
+            return self.paginator.build_page([row async for row in page])
+        return await sync_to_async(self.paginate_queryset)(queryset)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404('No %s matches the given query.' % queryset.model._meta.object_name)
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class AsyncListMixin:
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(self, views.ValuesListMixin) and self.use_values():
+            return await self.alist_values(queryset)
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else [row async for row in queryset]
+        # A list serializer may read more rows (orders not summarized yet),
+        # which has to happen in a sync context.
+        data = await sync_to_async(lambda: self.get_serializer(rows, many=True).data)()
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    async def alist_values(self, queryset):
+        serializer_class = self.values_serializer_class
+        queryset = serializer_class.values(queryset)
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else [row async for row in queryset]
+        # A values serializer may read more rows (orders not summarized yet),
+        # which has to happen in a sync context.
+        data = await sync_to_async(lambda: serializer_class(rows, many=True).data)()
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class AsyncRetrieveMixin:
+    async def get(self, request, *args, **kwargs):
+        return await self.aretrieve(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(await self.aget_object()).data)
+
+
+class MenuItemList(AsyncMenuCacheMixin, AsyncListMixin, AsyncAPIViewMixin, views.MenuItemList):
+    pass
+
+
+class MenuItemDetailView(AsyncMenuCacheMixin, AsyncRetrieveMixin, AsyncAPIViewMixin, views.MenuItemDetailView):
+    pass
+
+
+class MenuItemsByCategoryView(AsyncMenuCacheMixin, AsyncListMixin, AsyncAPIViewMixin,
+                              views.MenuItemsByCategoryView):
+    async def aget_category(self, name):
+        category = await Category.objects.filter(slug=slugify(name)).afirst()
+        if category is None:
+            category = await Category.objects.filter(title__iexact=name).afirst()
+        return category
+
+    async def alist(self, request, *args, **kwargs):
+        category_name = self.request.query_params.get('category', None)
+
+        if category_name:
+            category = await self.aget_category(category_name)
+            items = [item async for item in MenuItem.objects.filter(category=category)] if category else []
+            if not items:
+                return Response(
+                    {'detail': f"No menu items found for category: '{category_name}' or category does not exist."},
+                    status=status.HTTP_200_OK
+                )
+            for item in items:
+                item.category = category
+        else:
+            items = [item async for item in self.get_queryset()]
+
+        serializer = self.get_serializer(items, many=True)
+        return Response(serializer.data)
+
+
+class OrderView(AsyncListMixin, AsyncAPIViewMixin, views.OrderView):
+    pass
+
+
+class OrderDetailView(AsyncRetrieveMixin, AsyncAPIViewMixin, views.OrderDetailView):
+    async def aget_object(self):
+        order = await super().aget_object()
+        self.check_order_access(order)
+        if order.lines is None:
+            await aprefetch_related_objects([order], *self.unsummarized_lookups)
+        return order
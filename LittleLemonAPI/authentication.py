@@ -0,0 +1,151 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from LittleLemonAPI.cache import is_shared
+from LittleLemonAPI.permissions import aget_roles, get_roles
+
+TOKEN_CACHE_TIMEOUT = 60 * 5
+LOCAL_CACHE_TIMEOUT = 10
+LOCAL_CACHE_SIZE = 1024
+
+
+def token_cache_key(key):
+    return 'auth:token:%s' % key
+
+
+class LocalCache:
+    """A small thread-safe LRU whose entries also expire after ``timeout`` seconds."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_users = LocalCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TIMEOUT)
+
+
+def invalidate_tokens(keys):
+    local_users.delete_many(keys)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that resolves the token's user from an in-process
+    LRU, then the shared cache, and only then the database. The shared tier
+    is skipped unless the default cache really is shared between workers
+    (see cache.is_shared()): a per-process cache would keep a revoked token
+    alive in other workers for TOKEN_CACHE_TIMEOUT.
+
+    The user comes back with its roles preloaded from the role cache, so a
+    warm request reaches the view without touching the database. signals.py
+    drops the shared entries when a token is deleted or its user changes;
+    other processes may keep serving their local copy for up to
+    LOCAL_CACHE_TIMEOUT seconds.
+
+    aauthenticate() does the same lookups without blocking, for the async
+    views.
+    """
+
+    def get_key(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed('Invalid token header. No credentials provided.')
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain spaces.')
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                'Invalid token header. Token string should not contain invalid characters.'
+            )
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return self.authenticate_credentials(key)
+
+    async def aauthenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        user = local_users.get(key)
+        if user is None:
+            shared = is_shared()
+            user = cache.get(token_cache_key(key)) if shared else None
+            if user is None:
+                user, _ = super().authenticate_credentials(key)
+                if shared:
+                    cache.set(token_cache_key(key), user, TOKEN_CACHE_TIMEOUT)
+            local_users.set(key, user)
+
+        user = self.prepare_user(user)
+        get_roles(user)
+        return user, self.get_model()(key=key, user=user)
+
+    async def aauthenticate_credentials(self, key):
+        user = local_users.get(key)
+        if user is None:
+            shared = is_shared()
+            user = await cache.aget(token_cache_key(key)) if shared else None
+            if user is None:
+                model = self.get_model()
+                try:
+                    user = (await model.objects.select_related('user').aget(key=key)).user
+                except model.DoesNotExist:
+                    raise exceptions.AuthenticationFailed('Invalid token.')
+                if shared:
+                    await cache.aset(token_cache_key(key), user, TOKEN_CACHE_TIMEOUT)
+            local_users.set(key, user)
+
+        user = self.prepare_user(user)
+        await aget_roles(user)
+        return user, self.get_model()(key=key, user=user)
+
+    def prepare_user(self, user):
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # Views may annotate request.user, so every request gets its own copy.
+        return copy.copy(user)
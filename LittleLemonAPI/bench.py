@@ -0,0 +1,183 @@
+import datetime
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.views import APIView
+
+from LittleLemonAPI import rollups, search, summaries
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.permissions import DELIVERY_CREW, MANAGER
+
+# Row counts at scale 1.0.
+DATASET = {
+    'categories': 20,
+    'menu_items': 10_000,
+    'users': 100_000,
+    'managers': 10,
+    'delivery_crew': 200,
+    'orders': 1_000_000,
+}
+BENCH_PASSWORD = 'bench-pass-1234'
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'},
+}
+FIRST_ORDER_DATE = datetime.date(2024, 1, 1)
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run the block against a throwaway, fully migrated database.
+
+    On SQLite the database is a temporary file rather than the in-memory
+    test database, so locking and I/O behave the way they do in production.
+    """
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(directory, 'bench.sqlite3')
+        try:
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                # Benchmarks fire far more requests than any rate limit allows,
+                # and their cache entries must not mix with the real database's.
+                with mock.patch.object(APIView, 'check_throttles', lambda self, request: None), \
+                        override_settings(CACHES=BENCHMARK_CACHES):
+                    yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            # Later test databases in this process must not point at the
+            # deleted directory.
+            test_settings['NAME'] = old_test_name
+
+
+@contextmanager
+def timer(samples):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append((time.perf_counter() - start) * 1000)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    return {
+        'n': len(samples),
+        'mean': statistics.fmean(samples),
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+    }
+
+
+@contextmanager
+def explicit_order_dates():
+    # bulk_create would otherwise stamp every seeded order with today.
+    field = Order._meta.get_field('date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed_dataset(scale=1.0, seed=0, batch_size=10000, progress=None):
+    """
+    Fill the database with a deterministic dataset of DATASET * ``scale`` rows.
+
+    Everything is bulk inserted; all users share one password hash, for
+    BENCH_PASSWORD. The first manager, delivery crew member and customer are
+    named bench-manager, bench-crew and bench-customer. Returns the row
+    counts.
+    """
+    rng = random.Random(seed)
+    counts = {name: max(1, int(count * scale)) for name, count in DATASET.items()}
+    counts['users'] = max(counts['users'], counts['managers'] + counts['delivery_crew'] + 1)
+    report = progress or (lambda name, done: None)
+
+    categories = Category.objects.bulk_create(
+        Category(slug=f'category-{n}', title=f'Category {n}') for n in range(counts['categories'])
+    )
+    items = MenuItem.objects.bulk_create((
+        MenuItem(
+            title=f'{rng.choice(["Greek", "Lemon", "Grilled", "Spicy", "House"])} '
+                  f'{rng.choice(["Salad", "Pasta", "Soup", "Fish", "Cake"])} {n}',
+            price=Decimal(rng.randrange(200, 3000)) / 100,
+            featured=rng.random() < 0.05,
+            category=rng.choice(categories),
+        ) for n in range(counts['menu_items'])
+    ), batch_size=batch_size)
+    report('menu_items', len(items))
+
+    password = make_password(BENCH_PASSWORD)
+    staff = {'manager': counts['managers'], 'crew': counts['delivery_crew']}
+    names = ['bench-manager'] + [f'manager-{n}' for n in range(1, staff['manager'])]
+    names += ['bench-crew'] + [f'crew-{n}' for n in range(1, staff['crew'])]
+    names += ['bench-customer'] + [f'user-{n}' for n in range(1, counts['users'] - len(names))]
+    users = User.objects.bulk_create(
+        (User(username=name, password=password) for name in names), batch_size=batch_size
+    )
+    managers = users[:staff['manager']]
+    crew = users[staff['manager']:staff['manager'] + staff['crew']]
+    customers = users[staff['manager'] + staff['crew']:]
+    report('users', len(users))
+
+    manager_group = Group.objects.get_or_create(name=MANAGER)[0]
+    crew_group = Group.objects.get_or_create(name=DELIVERY_CREW)[0]
+    User.groups.through.objects.bulk_create(
+        [User.groups.through(user=user, group=manager_group) for user in managers]
+        + [User.groups.through(user=user, group=crew_group) for user in crew]
+    )
+
+    prices = [item.price for item in items]
+    with explicit_order_dates():
+        for start in range(0, counts['orders'], batch_size):
+            size = min(batch_size, counts['orders'] - start)
+            lines = [rng.sample(range(len(items)), rng.randint(1, min(4, len(items)))) for _ in range(size)]
+            quantities = [[rng.randint(1, 3) for _ in order_lines] for order_lines in lines]
+            orders, order_items = [], []
+            for order_lines, order_quantities in zip(lines, quantities):
+                status = rng.choice([None, 0, 1, 1])
+                order = Order(
+                    user=rng.choice(customers),
+                    delivery_crew=None if status is None else rng.choice(crew),
+                    status=status,
+                    total=sum(prices[line] * quantity for line, quantity in zip(order_lines, order_quantities)),
+                    date=FIRST_ORDER_DATE + datetime.timedelta(days=rng.randrange(365)),
+                )
+                line_items = [
+                    OrderItem(order=order, menuitem=items[line], quantity=quantity,
+                              unit_price=prices[line], price=prices[line] * quantity)
+                    for line, quantity in zip(order_lines, order_quantities)
+                ]
+                summaries.summarize(order, line_items)
+                orders.append(order)
+                order_items += line_items
+            Order.objects.bulk_create(orders)
+            OrderItem.objects.bulk_create(order_items, batch_size=batch_size)
+            report('orders', start + size)
+
+    search.rebuild_index(MenuItem.objects.all())
+    for _ in rollups.rebuild(batch_size):
+        pass
+    counts['order_items'] = OrderItem.objects.count()
+    return counts
@@ -0,0 +1,161 @@
+import hashlib
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from LittleLemonAPI.models import CatalogVersion, Category, MenuItem
+
+MENU_VERSION_KEY = 'menu:version'
+MENU_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Whether every worker process reads and writes the same entries in the
+    cache ``alias``. The local-memory and dummy caches are per process, so
+    deleting or replacing an entry there is invisible to other workers.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def get_menu_version():
+    if not is_shared():
+        # Another worker's bump would never reach this process's cache, so
+        # the version comes from the database, one primary key lookup.
+        return CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        # Seed with a clock value so a version lost to eviction or a restart
+        # can never collide with one handed out earlier.
+        cache.add(MENU_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+async def aget_menu_version():
+    if not is_shared():
+        return await CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).afirst() or 0
+    version = await cache.aget(MENU_VERSION_KEY)
+    if version is None:
+        await cache.aadd(MENU_VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    if not is_shared():
+        # A clock value rather than an increment, so the upsert needs no read
+        # and concurrent bumps cannot hand out a version seen before.
+        version = time.time_ns()
+        CatalogVersion.objects.bulk_create(
+            [CatalogVersion(pk=1, version=version)],
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=['version']
+        )
+        return version
+    try:
+        return cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(MENU_VERSION_KEY, version, None)
+        return version
+
+
+def menu_cache_key(request, version):
+    # The paginated payload embeds absolute next/previous links, so the host
+    # is part of the representation along with the path and the media type.
+    raw = '|'.join([request.get_host(), request.get_full_path(), request.accepted_media_type or ''])
+    return 'menu:%s:%s' % (version, hashlib.md5(raw.encode()).hexdigest())
+
+
+def menu_etag(cache_key):
+    return '"%s"' % hashlib.sha1(cache_key.encode()).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+class MenuCacheMixin:
+    """
+    Serves GET responses from a cache keyed by the menu catalog version.
+
+    The version is bumped whenever a MenuItem or Category is saved or deleted
+    (see signals.py), so stale entries are never read again and simply expire.
+    It lives in the cache when the cache is shared between workers, and in
+    the CatalogVersion row otherwise, at the cost of one query per request.
+    """
+
+    def get(self, request, *args, **kwargs):
+        key = menu_cache_key(request, get_menu_version())
+        etag = menu_etag(key)
+
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        data = cache.get(key)
+        if data is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, MENU_CACHE_TIMEOUT)
+
+        return Response(data, headers={'ETag': etag})
+
+
+class AsyncMenuCacheMixin:
+    """MenuCacheMixin for async views; same keys, same entries."""
+
+    async def get(self, request, *args, **kwargs):
+        key = menu_cache_key(request, await aget_menu_version())
+        etag = menu_etag(key)
+
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        data = await cache.aget(key)
+        if data is None:
+            response = await super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            await cache.aset(key, data, MENU_CACHE_TIMEOUT)
+
+        return Response(data, headers={'ETag': etag})
+
+
+def build_full_menu():
+    categories = {
+        category.pk: {'id': category.pk, 'slug': category.slug, 'title': category.title, 'items': []}
+        for category in Category.objects.order_by('title', 'pk')
+    }
+    for item in MenuItem.objects.order_by('title', 'pk').values('id', 'title', 'price', 'featured', 'category_id'):
+        categories[item.pop('category_id')]['items'].append(dict(item, price='{:f}'.format(item['price'])))
+    return JSONRenderer().render(list(categories.values()))
+
+
+def get_full_menu():
+    """
+    Return ``(payload, etag)`` for the whole menu grouped by category.
+
+    The payload is rendered JSON, built once per catalog version and then
+    served as-is until the next catalog change.
+    """
+    key = 'menu:%s:full' % get_menu_version()
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_full_menu()
+        cache.set(key, payload, MENU_CACHE_TIMEOUT)
+    return payload, menu_etag(key)
@@ -0,0 +1,296 @@
+"""
+Where carts live between checkouts, chosen by the CART_STORE setting.
+
+DatabaseCartStore, the default, keeps them in the Cart table, one write
+transaction per change. CacheCartStore inserts new cart lines into the Cart
+table at once but keeps later changes in a shared Django cache, writing them
+back only at checkout, or once the cart has been left alone for ``timeout``
+seconds. Either way the Cart table is what a cart falls back to when its
+cached copy is missing.
+"""
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from LittleLemonAPI.cache import is_shared
+from LittleLemonAPI.models import Cart, MenuItem
+
+
+class DatabaseCartStore:
+    """Carts in the Cart table only."""
+
+    def items(self, user):
+        return list(Cart.objects.filter(user=user).select_related('menuitem__category'))
+
+    def add(self, user, rows):
+        rows = list(rows)
+        Cart.objects.bulk_create(
+            (Cart(user=user, menuitem=menuitem, quantity=quantity, unit_price=menuitem.price)
+             for menuitem, quantity in rows),
+            update_conflicts=True,
+            unique_fields=['user', 'menuitem'],
+            update_fields=['quantity', 'unit_price']
+        )
+        saved = {
+            cart_item.menuitem_id: cart_item
+            for cart_item in Cart.objects.filter(user=user, menuitem__in=[menuitem for menuitem, _ in rows])
+            .select_related('menuitem__category')
+        }
+        return [saved[menuitem.pk] for menuitem, _ in rows]
+
+    def clear(self, user):
+        return Cart.objects.filter(user=user).delete()[0]
+
+    @contextmanager
+    def checkout(self, user):
+        yield
+
+    def evict(self, user):
+        pass
+
+    def sweep(self, force=False):
+        return 0
+
+
+class CacheCartStore:
+    """
+    Carts in a Django cache, written behind to the Cart table.
+
+    Each cart is one cache entry holding its lines and whether they differ
+    from the table. A line is inserted into the table when it is first
+    added, so it has its row's id from the start; changing its quantity or
+    clearing the cart only touches the cache. Added lines reach the cache
+    once the request's transaction commits, so a rolled back request leaves
+    no trace there. The first change to a clean cart appends the user to a
+    journal; sweep() walks the journal and writes back the carts idle for
+    ``timeout`` seconds, and a small share of changes run it. Run
+    ``manage.py flush_carts`` more often than ``timeout`` as well, so idle
+    carts are written back before the cache drops them (after twice
+    ``timeout``).
+
+    Changes to one cart are serialized by a lock entry taken with the
+    cache's atomic add().
+
+    The cache holds changes that are nowhere else, so ``alias`` must be one
+    every worker process shares and that keeps entries until they expire,
+    such as Redis. The per-process memory cache and Memcached, which evicts
+    under memory pressure, are refused. File and database caches cull past
+    their MAX_ENTRIES option, so set it well above the number of open carts.
+    """
+    sweep_probability = 0.01
+    lock_timeout = 5
+
+    def __init__(self, alias='default', timeout=30 * 60, prefix='cart'):
+        if not is_shared(alias) or isinstance(caches[alias], BaseMemcachedCache):
+            raise ImproperlyConfigured(
+                f'CacheCartStore needs a cache that every worker shares and that does not evict entries; '
+                f'CACHES[{alias!r}] is {type(caches[alias]).__name__}. Use DatabaseCartStore instead.'
+            )
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.prefix = prefix
+
+    def key(self, name):
+        return f'{self.prefix}:{name}'
+
+    @contextmanager
+    def locked(self, user_id):
+        # The lock entry expires on its own, so a crashed holder delays
+        # others by at most lock_timeout.
+        key = self.key(f'{user_id}:lock')
+        while not self.cache.add(key, 1, self.lock_timeout):
+            time.sleep(0.005)
+        try:
+            yield
+        finally:
+            self.cache.delete(key)
+
+    def load(self, user):
+        """
+        The user's cache entry, and the Cart rows it was built from when it
+        was not cached (None otherwise).
+        """
+        key = self.key(user.pk)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry, None
+        rows = list(Cart.objects.filter(user=user).select_related('menuitem__category'))
+        entry = {
+            'lines': {row.menuitem_id: [row.quantity, row.unit_price, row.pk] for row in rows},
+            'dirty': False,
+            'slot': 0,
+            'touched': time.time(),
+        }
+        self.cache.add(key, entry, self.timeout * 2)
+        return entry, rows
+
+    def store(self, user, entry):
+        # A cart already in the journal is only added again once a sweep has
+        # passed its slot without writing it back.
+        if not entry['dirty'] or entry['slot'] <= self.cache.get(self.key('swept'), 0):
+            entry['slot'] = self.journal(user.pk)
+        entry.update(dirty=True, touched=time.time())
+        self.cache.set(self.key(user.pk), entry, self.timeout * 2)
+
+    def maybe_sweep(self):
+        # Called without holding a cart lock, which sweep() takes. Deferred to
+        # commit so a rolled back request cannot undo a write-back whose
+        # cache entry is already gone.
+        if random.random() < self.sweep_probability:
+            transaction.on_commit(self.sweep)
+
+    def journal(self, user_id):
+        self.cache.add(self.key('journal'), 0, None)
+        slot = self.cache.incr(self.key('journal'))
+        self.cache.set(self.key(f'journal:{slot}'), user_id, None)
+        return slot
+
+    def items(self, user):
+        entry, rows = self.load(user)
+        if rows is not None:
+            return rows
+        menu = MenuItem.objects.select_related('category').in_bulk(entry['lines'])
+        return [
+            Cart(pk=pk, user=user, menuitem=menu[menuitem_id], quantity=quantity, unit_price=unit_price)
+            for menuitem_id, (quantity, unit_price, pk) in entry['lines'].items() if menuitem_id in menu
+        ]
+
+    def add(self, user, rows):
+        rows = list(rows)
+        with self.locked(user.pk):
+            entry, _ = self.load(user)
+            new = [
+                Cart(user=user, menuitem=menuitem, quantity=quantity, unit_price=menuitem.price)
+                for menuitem, quantity in rows if menuitem.pk not in entry['lines']
+            ]
+            if new:
+                # The rows give new lines their ids; the upsert covers a row
+                # written back by another worker since this entry was loaded.
+                Cart.objects.bulk_create(
+                    new,
+                    update_conflicts=True,
+                    unique_fields=['user', 'menuitem'],
+                    update_fields=['quantity', 'unit_price']
+                )
+            ids = {cart_item.menuitem_id: cart_item.pk for cart_item in new}
+            lines = {}
+            for menuitem, quantity in rows:
+                pk = ids.get(menuitem.pk) or entry['lines'].get(menuitem.pk, [None, None, None])[2]
+                lines[menuitem.pk] = [quantity, menuitem.price, pk]
+        # The rows inserted above are not there for anyone else until then.
+        transaction.on_commit(lambda: self.update(user, lines))
+        self.maybe_sweep()
+        return [
+            Cart(pk=lines[menuitem.pk][2], user=user, menuitem=menuitem, quantity=quantity, unit_price=menuitem.price)
+            for menuitem, quantity in rows
+        ]
+
+    def update(self, user, lines):
+        """Set ``lines`` on the user's cached cart, over whatever else changed meanwhile."""
+        with self.locked(user.pk):
+            entry, _ = self.load(user)
+            entry['lines'].update(lines)
+            self.store(user, entry)
+
+    def clear(self, user):
+        with self.locked(user.pk):
+            entry, _ = self.load(user)
+            count = len(entry['lines'])
+            if count:
+                entry['lines'] = {}
+                self.store(user, entry)
+        self.maybe_sweep()
+        return count
+
+    def write(self, user_id, lines):
+        """Make the user's Cart rows match ``lines``, skipping menu items deleted since."""
+        menu = set(MenuItem.objects.filter(pk__in=lines).values_list('pk', flat=True))
+        with transaction.atomic():
+            Cart.objects.filter(user_id=user_id).exclude(menuitem__in=menu).delete()
+            Cart.objects.bulk_create(
+                (Cart(user_id=user_id, menuitem_id=menuitem_id, quantity=quantity, unit_price=unit_price)
+                 for menuitem_id, (quantity, unit_price, _) in lines.items() if menuitem_id in menu),
+                update_conflicts=True,
+                unique_fields=['user', 'menuitem'],
+                update_fields=['quantity', 'unit_price']
+            )
+
+    @contextmanager
+    def checkout(self, user):
+        """
+        Write the cart back and hold it while the order is placed from the
+        Cart table. The cached copy is dropped afterwards, since checkout
+        empties the table's cart.
+        """
+        with self.locked(user.pk):
+            entry = self.cache.get(self.key(user.pk))
+            if entry is not None and entry['dirty']:
+                self.write(user.pk, entry['lines'])
+            try:
+                yield
+            finally:
+                self.cache.delete(self.key(user.pk))
+
+    def evict(self, user):
+        """Forget the cached copy of a cart without writing it back."""
+        self.cache.delete(self.key(user.pk))
+
+    def sweep(self, force=False):
+        """
+        Write back the journaled carts idle for ``timeout`` seconds, or all
+        of them with ``force``, and evict them. Returns how many were
+        written.
+        """
+        if not self.cache.add(self.key('sweeping'), 1, 60):
+            return 0
+        try:
+            start = self.cache.get(self.key('swept'), 0)
+            end = self.cache.get(self.key('journal'), 0)
+            slots = [self.key(f'journal:{slot}') for slot in range(start + 1, end + 1)]
+            user_ids = set(self.cache.get_many(slots).values())
+            self.cache.delete_many(slots)
+            self.cache.set(self.key('swept'), end, None)
+
+            written, now = 0, time.time()
+            for user_id in user_ids:
+                with self.locked(user_id):
+                    entry = self.cache.get(self.key(user_id))
+                    if entry is None or not entry['dirty']:
+                        continue
+                    if force or now - entry['touched'] >= self.timeout:
+                        self.write(user_id, entry['lines'])
+                        self.cache.delete(self.key(user_id))
+                        written += 1
+                    else:
+                        entry['slot'] = self.journal(user_id)
+                        self.cache.set(self.key(user_id), entry, self.timeout * 2)
+            return written
+        finally:
+            self.cache.delete(self.key('sweeping'))
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        config = settings.CART_STORE
+        _store = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting in ('CART_STORE', 'CACHES'):
+        _store = None
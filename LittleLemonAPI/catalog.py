@@ -0,0 +1,210 @@
+"""
+Bulk import and export of the menu catalog.
+
+Each row is one menu item: ``id`` (blank for a new item), ``title``,
+``price``, ``featured``, ``category`` (a category slug) and
+``category_title``. Unknown slugs create their category, which then needs a
+``category_title``; a known slug with a different ``category_title``
+renames it. Export writes the same columns, so a file can be exported,
+edited and imported again.
+
+Rows are read one at a time from CSV or NDJSON and applied in batches, each
+in its own transaction, with bulk_create/bulk_update. Categories come from
+one map loaded up front, so no row costs a query of its own. Invalid rows
+are reported by line and skipped; the rest are applied.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+
+from LittleLemonAPI import search
+from LittleLemonAPI.cache import bump_menu_version
+from LittleLemonAPI.models import Category, MenuItem
+from LittleLemonAPI.serializers import MenuImportRowSerializer
+
+FIELDS = ['id', 'title', 'price', 'featured', 'category', 'category_title']
+REQUIRED_FIELDS = ['title', 'price', 'category']
+BATCH_SIZE = 500
+CHUNK_SIZE = 2000
+
+
+class CatalogFormatError(ValueError):
+    """The input as a whole cannot be read, e.g. a CSV without a title column."""
+
+
+def parse_csv(lines):
+    """Yield ``(line number, row, error)`` from CSV text lines with a header row."""
+    reader = csv.DictReader(lines)
+    missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise CatalogFormatError(f'Missing columns: {", ".join(missing)}.')
+    for row in reader:
+        # Blank cells mean "not given", as a missing key does in NDJSON.
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}, None
+
+
+def parse_ndjson(lines):
+    """Yield ``(line number, row, error)`` from NDJSON text lines, one object per line."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None, 'Invalid JSON.'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Expected a JSON object.'
+            continue
+        yield number, row, None
+
+
+def parse_list(rows):
+    """Yield ``(position, row, error)`` from an already parsed JSON list."""
+    for number, row in enumerate(rows, 1):
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, 'Expected a JSON object.'
+
+
+PARSERS = {'csv': parse_csv, 'ndjson': parse_ndjson}
+
+
+def read_lines(stream):
+    """Decode a binary stream of UTF-8 lines lazily, dropping any byte order mark."""
+    return codecs.iterdecode(stream, 'utf-8-sig')
+
+
+class MenuImport:
+    """
+    Validates and applies parsed rows, keeping the counts and errors for
+    report(). With ``dry_run`` everything is validated and counted but
+    nothing is written.
+    """
+
+    def __init__(self, dry_run=False, batch_size=BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.categories = {category.slug: category for category in Category.objects.all()}
+        self.rows = 0
+        self.created = {'categories': 0, 'menu_items': 0}
+        self.updated = {'categories': 0, 'menu_items': 0}
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        try:
+            while batch := list(islice(rows, self.batch_size)):
+                self.import_batch(batch)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Nothing past this point can be read; batches already applied stay.
+            self.error(None, {'non_field_errors': [f'Unreadable input after row {self.rows}: {exc}']})
+        return self.report()
+
+    def report(self):
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'errors': self.errors,
+        }
+
+    def error(self, line, errors):
+        self.errors.append({'line': line, 'errors': errors})
+
+    def import_batch(self, batch):
+        valid = []
+        for line, row, error in batch:
+            self.rows += 1
+            if error is not None:
+                self.error(line, {'non_field_errors': [error]})
+                continue
+            serializer = MenuImportRowSerializer(data=row)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self.error(line, serializer.errors)
+
+        existing = MenuItem.objects.in_bulk({data['id'] for _, data in valid if 'id' in data})
+        new_categories, renamed, new_items, changed = {}, {}, [], {}
+        for line, data in valid:
+            if 'id' in data:
+                item = existing.get(data['id'])
+                if item is None:
+                    self.error(line, {'id': [f'Menu item {data["id"]} does not exist.']})
+                    continue
+            else:
+                item = MenuItem()
+
+            category = self.categories.get(data['category'])
+            title = data.get('category_title')
+            if category is None:
+                if not title:
+                    self.error(line, {'category_title': [f'Required to create category "{data["category"]}".']})
+                    continue
+                category = self.categories[data['category']] = Category(slug=data['category'], title=title)
+                new_categories[category.slug] = category
+            elif title and title != category.title:
+                category.title = title
+                if category.pk is not None:
+                    renamed[category.slug] = category
+
+            if item.pk is None:
+                new_items.append(item)
+            else:
+                changed[item.pk] = item
+            item.title = data['title']
+            item.price = data['price']
+            # A blank featured cell leaves an existing item as it was.
+            if 'featured' in data:
+                item.featured = data['featured']
+            item.category = category
+
+        self.created['categories'] += len(new_categories)
+        self.updated['categories'] += len(renamed)
+        self.created['menu_items'] += len(new_items)
+        self.updated['menu_items'] += len(changed)
+        if not self.dry_run:
+            self.apply(list(new_categories.values()), list(renamed.values()), new_items, list(changed.values()))
+
+    def apply(self, new_categories, renamed, new_items, changed):
+        with transaction.atomic():
+            Category.objects.bulk_create(new_categories)
+            if renamed:
+                Category.objects.bulk_update(renamed, ['title'])
+            MenuItem.objects.bulk_create(new_items)
+            if changed:
+                MenuItem.objects.bulk_update(changed, ['title', 'price', 'featured', 'category'])
+
+            # bulk_create and bulk_update send no signals, so do what the
+            # MenuItem and Category receivers would.
+            items = [*new_items, *changed]
+            search.index_menu_items((item.pk, item.title, item.category.title) for item in items)
+            if renamed:
+                search.index_menu_items(
+                    MenuItem.objects.filter(category__in=renamed).exclude(pk__in=[item.pk for item in items])
+                    .values_list('pk', 'title', 'category__title')
+                )
+            if new_categories or renamed or items:
+                transaction.on_commit(bump_menu_version)
+
+
+def export_rows():
+    """Every menu item as an import row, in id order, read a chunk at a time."""
+    rows = MenuItem.objects.order_by('pk').values_list(
+        'pk', 'title', 'price', 'featured', 'category__slug', 'category__title'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    for pk, title, price, featured, slug, category_title in rows:
+        yield {
+            'id': pk,
+            'title': title,
+            'price': '{:f}'.format(price),
+            'featured': featured,
+            'category': slug,
+            'category_title': category_title,
+        }
@@ -0,0 +1,35 @@
+import functools
+import random
+import time
+
+from django.db import OperationalError, connection
+
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05
+LOCK_BACKOFF_MAX = 1.0
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_locked(func):
+    """
+    Retry ``func`` when SQLite reports the database as locked.
+
+    The busy timeout already waits for the lock; this covers the writer that
+    still loses, with up to LOCK_RETRIES attempts and jittered exponential
+    backoff. Inside an enclosing transaction a retry cannot help, since the
+    failed statement has already spoiled it, so the error is raised as is.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt == LOCK_RETRIES or connection.in_atomic_block or not is_lock_error(exc):
+                    raise
+            time.sleep(random.uniform(0, min(LOCK_BACKOFF_MAX, LOCK_BACKOFF * 2 ** attempt)))
+    return wrapper
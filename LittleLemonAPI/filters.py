@@ -0,0 +1,20 @@
+from rest_framework.filters import BaseFilterBackend
+
+from LittleLemonAPI.serializers import OrderFilterSerializer
+
+
+class OrderFilterBackend(BaseFilterBackend):
+    """
+    Structured order filters from the query string.
+
+    Every parameter is validated by OrderFilterSerializer first, so a bad
+    value is a 400 rather than a query, and each one becomes an equality or
+    range predicate that one of Order's indexes can answer:
+    ``?status=0|1|unassigned``, ``?delivery_crew=<id|username|unassigned>``,
+    ``?customer=<id|username>``, ``?date_from=``/``?date_to=`` (YYYY-MM-DD)
+    and ``?total_min=``/``?total_max=``.
+    """
+    def filter_queryset(self, request, queryset, view):
+        params = OrderFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.filter_queryset(queryset)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import summaries
+
+
+class Command(BaseCommand):
+    help = 'Fill in the summary columns of orders placed before order summaries existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=summaries.BATCH_SIZE,
+                            help='Orders summarized per batch; each batch commits on its own.')
+        parser.add_argument('--all', action='store_true',
+                            help='Re-summarize every order, not just those without a summary.')
+
+    def handle(self, *args, **options):
+        done = 0
+        for done in summaries.backfill(options['batch_size'], everything=options['all']):
+            self.stdout.write(f'{done} orders summarized', ending='\r')
+        self.stdout.write(self.style.SUCCESS(f'Summarized {done} orders.'))
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient
+from rest_framework.authtoken.models import Token
+
+from LittleLemonAPI.bench import benchmark_database, summarize
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+
+ROUTES = [('menu list', 'menu-items'), ('order list', 'orders/'), ('order detail', 'orders/{order}/')]
+
+
+class Command(BaseCommand):
+    help = 'Compare the sync and async read views under ASGI at the same request concurrency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,10,50', help='Comma separated in-flight request counts.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per route, view kind and concurrency.')
+        parser.add_argument('--orders', type=int, default=200, help='Orders owned by the benchmark customer.')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        # Match asgi.py: no persistent connections under ASGI.
+        saved, connection.settings_dict['CONN_MAX_AGE'] = connection.settings_dict['CONN_MAX_AGE'], 0
+        try:
+            with benchmark_database():
+                headers, order = self.seed(options['orders'])
+                self.stdout.write(
+                    f'{"route":<13} {"kind":<6} {"conc":>5} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} '
+                    f'{"threads":>8}  (ms)'
+                )
+                for name, path in ROUTES:
+                    path = path.format(order=order.pk)
+                    for level in levels:
+                        for kind, prefix in (('sync', '/api/'), ('async', '/api/async/')):
+                            rate, stats, threads = asyncio.run(
+                                self.drive(prefix + path, headers, level, options['requests'])
+                            )
+                            self.stdout.write(
+                                f'{name:<13} {kind:<6} {level:>5} {rate:>8.1f} {stats["p50"]:>8.2f} '
+                                f'{stats["p95"]:>8.2f} {stats["p99"]:>8.2f} {threads:>8}'
+                            )
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = saved
+
+    def seed(self, orders):
+        category = Category.objects.create(slug='bench', title='Bench')
+        items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Item {i}', price='9.99', category=category) for i in range(20)
+        )
+        user = User.objects.create_user('bench-customer')
+        created = Order.objects.bulk_create(Order(user=user, total='29.97') for _ in range(orders))
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menuitem=items[n % len(items)], quantity=3, unit_price='9.99', price='29.97')
+            for n, order in enumerate(created)
+        )
+        token = Token.objects.create(user=user)
+        return {'Authorization': f'Token {token.key}'}, created[0]
+
+    async def drive(self, path, headers, concurrency, requests):
+        client = AsyncClient()
+        samples = []
+        peak = threading.active_count()
+        done = asyncio.Event()
+
+        async def monitor():
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, threading.active_count())
+                await asyncio.sleep(0.005)
+
+        async def worker(count):
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                samples.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.content
+
+        watcher = asyncio.create_task(monitor())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await watcher
+        return len(samples) / elapsed, summarize(samples), peak
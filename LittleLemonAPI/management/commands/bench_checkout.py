@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from LittleLemonAPI.bench import benchmark_database, summarize, timer
+from LittleLemonAPI.models import Cart, Category, MenuItem
+
+
+class Command(BaseCommand):
+    help = 'Measure POST /api/orders/ latency and query count as the cart grows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,5,10,25,50,100',
+                            help='Comma separated cart sizes to measure.')
+        parser.add_argument('--repeat', type=int, default=30, help='Checkouts per cart size.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        with benchmark_database():
+            category = Category.objects.create(slug='bench', title='Bench')
+            items = MenuItem.objects.bulk_create(
+                MenuItem(title=f'Item {i}', price='9.99', category=category) for i in range(max(sizes))
+            )
+            user = User.objects.create_user('bench-customer')
+            client = APIClient()
+            client.force_authenticate(user)
+
+            self.stdout.write(f'{"items":>6} {"queries":>8} {"mean":>8} {"p50":>8} {"p95":>8} {"p99":>8}  (ms)')
+            for size in sizes:
+                samples = []
+                for _ in range(options['repeat']):
+                    Cart.objects.bulk_create(
+                        Cart(user=user, menuitem=item, quantity=2, unit_price=item.price) for item in items[:size]
+                    )
+                    with CaptureQueriesContext(connection) as queries, timer(samples):
+                        response = client.post('/api/orders/')
+                    assert response.status_code == 201, response.content
+
+                stats = summarize(samples)
+                self.stdout.write(
+                    f'{size:>6} {len(queries):>8} {stats["mean"]:>8.2f} {stats["p50"]:>8.2f} '
+                    f'{stats["p95"]:>8.2f} {stats["p99"]:>8.2f}'
+                )
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+from LittleLemonAPI.bench import benchmark_database, summarize, timer
+from LittleLemonAPI.models import Category, MenuItem
+
+# What the project ran with before: a plain sqlite3 database, a fresh
+# connection per request, deferred transactions and no retries.
+STOCK = {'OPTIONS': {}, 'CONN_MAX_AGE': 0}
+
+
+class Command(BaseCommand):
+    help = 'Run concurrent cart and checkout workers and report throughput and error rate.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,4,8,16', help='Comma separated worker counts.')
+        parser.add_argument('--rounds', type=int, default=20, help='Checkouts per worker.')
+        parser.add_argument('--items', type=int, default=5, help='Cart lines per checkout.')
+        parser.add_argument('--stock', action='store_true',
+                            help='Also measure the stock SQLite settings for comparison.')
+
+    def handle(self, *args, **options):
+        workers = [int(n) for n in options['workers'].split(',')]
+        profiles = [('tuned', {})]
+        if options['stock']:
+            profiles.insert(0, ('stock', STOCK))
+
+        self.stdout.write(
+            f'{"profile":<8} {"workers":>7} {"orders/s":>9} {"errors":>7} {"p50":>8} {"p95":>8} {"p99":>8}  (ms)'
+        )
+        for name, overrides in profiles:
+            for count in workers:
+                throughput, errors, stats = self.measure(overrides, count, options['rounds'], options['items'])
+                self.stdout.write(
+                    f'{name:<8} {count:>7} {throughput:>9.1f} {errors:>6.1%} '
+                    f'{stats["p50"]:>8.2f} {stats["p95"]:>8.2f} {stats["p99"]:>8.2f}'
+                )
+
+    def measure(self, overrides, workers, rounds, items):
+        saved = {key: connection.settings_dict[key] for key in overrides}
+        connection.settings_dict.update(overrides)
+        retries = mock.patch('LittleLemonAPI.db.LOCK_RETRIES', 0) if overrides else nullcontext()
+        try:
+            with benchmark_database(), retries:
+                category = Category.objects.create(slug='bench', title='Bench')
+                menu = MenuItem.objects.bulk_create(
+                    MenuItem(title=f'Item {i}', price='9.99', category=category) for i in range(items)
+                )
+                body = [{'menuitem_id': item.pk, 'quantity': 2} for item in menu]
+                users = [User.objects.create_user(f'bench-{n}') for n in range(workers)]
+                connection.close()
+                # Failed checkouts are counted, not logged one traceback at a time.
+                logging.disable(logging.ERROR)
+
+                samples, outcomes = [], []
+                threads = [
+                    threading.Thread(target=self.worker, args=(user, body, rounds, samples, outcomes))
+                    for user in users
+                ]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+        finally:
+            connection.settings_dict.update(saved)
+            logging.disable(logging.NOTSET)
+
+        orders = sum(1 for ok in outcomes if ok)
+        return orders / elapsed, 1 - orders / len(outcomes), summarize(samples)
+
+    def worker(self, user, body, rounds, samples, outcomes):
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user)
+        try:
+            for _ in range(rounds):
+                with timer(samples):
+                    added = client.post('/api/cart/menu-items/', body, format='json').status_code == 201
+                    ordered = added and client.post('/api/orders/').status_code == 201
+                outcomes.append(ordered)
+        finally:
+            connections.close_all()
@@ -0,0 +1,62 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import search
+from LittleLemonAPI.bench import benchmark_database, summarize, timer
+from LittleLemonAPI.models import Category, MenuItem
+
+ADJECTIVES = ['spicy', 'grilled', 'roasted', 'crispy', 'smoked', 'creamy', 'tangy', 'garlic', 'lemon', 'herbed']
+NOUNS = ['chicken', 'salmon', 'pasta', 'risotto', 'salad', 'burger', 'pizza', 'soup', 'tart', 'gnocchi',
+         'lamb', 'falafel', 'halloumi', 'octopus', 'tiramisu', 'baklava', 'moussaka', 'souvlaki']
+QUERIES = ['pasta', 'spicy chicken', 'gri', 'smoked salm', 'tiramsu', 'moussaka 42', 'lemon tart']
+
+
+class Command(BaseCommand):
+    help = 'Compare the FTS5 menu search against the icontains scan it replaced.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000, help='Menu items in the catalog.')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs per query and path.')
+        parser.add_argument('--limit', type=int, default=20, help='Results per search.')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stderr.write('Full-text search needs the SQLite backend.')
+            return
+
+        rng = random.Random(0)
+        with benchmark_database():
+            categories = Category.objects.bulk_create(
+                Category(slug=f'category-{i}', title=f'{noun.title()} Dishes') for i, noun in enumerate(NOUNS)
+            )
+            MenuItem.objects.bulk_create(
+                (
+                    MenuItem(
+                        title=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {i}',
+                        price='9.99',
+                        category=rng.choice(categories),
+                    ) for i in range(options['items'])
+                ),
+                batch_size=5000,
+            )
+            search.rebuild_index(MenuItem.objects.all())
+
+            limit = options['limit']
+            paths = {
+                'icontains': lambda q: list(MenuItem.objects.filter(title__icontains=q)[:limit]),
+                'fts5': lambda q: list(MenuItem.objects.in_bulk(search.search_menu_item_ids(q, limit)).values()),
+            }
+
+            self.stdout.write(f'{"query":<16} {"path":<10} {"hits":>5} {"p50":>8} {"p95":>8} {"p99":>8}  (ms)')
+            for query in QUERIES:
+                for name, run in paths.items():
+                    samples = []
+                    for _ in range(options['repeat']):
+                        with timer(samples):
+                            hits = run(query)
+                    stats = summarize(samples)
+                    self.stdout.write(
+                        f'{query:<16} {name:<10} {len(hits):>5} {stats["p50"]:>8.2f} '
+                        f'{stats["p95"]:>8.2f} {stats["p99"]:>8.2f}'
+                    )
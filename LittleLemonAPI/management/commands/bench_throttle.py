@@ -0,0 +1,63 @@
+import os
+import pickle
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import UserRateThrottle
+
+from LittleLemonAPI.bench import summarize, timer
+from LittleLemonAPI.throttles import CacheCounterStore, SQLiteCounterStore, UserSlidingWindowThrottle
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request throttle overhead and state size for the stock and sliding-window throttles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rates', default='5,100,1000',
+                            help='Comma separated allowances per window to measure.')
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per throttle and rate.')
+        parser.add_argument('--keys', type=int, default=50, help='Distinct users the requests are spread over.')
+
+    def handle(self, *args, **options):
+        rates = [int(rate) for rate in options['rates'].split(',')]
+
+        with tempfile.TemporaryDirectory() as directory:
+            stores = [
+                ('stock (locmem)', None),
+                ('sliding (locmem)', CacheCounterStore()),
+                ('sliding (sqlite)', SQLiteCounterStore(os.path.join(directory, 'throttle.sqlite3'))),
+            ]
+            self.stdout.write(f'{"throttle":<18} {"rate":>6} {"state B":>8} {"mean":>8} {"p50":>8} {"p99":>8}  (us)')
+            for rate in rates:
+                for name, store in stores:
+                    cache.clear()
+                    samples, state = self.run(store, rate, options['requests'], options['keys'])
+                    stats = summarize(samples)
+                    self.stdout.write(
+                        f'{name:<18} {rate:>6} {state:>8} {stats["mean"] * 1000:>8.1f} '
+                        f'{stats["p50"] * 1000:>8.1f} {stats["p99"] * 1000:>8.1f}'
+                    )
+
+    def run(self, store, rate, requests, keys):
+        # Requests arrive every half second inside a one hour window, so the
+        # stock throttle's timestamp history grows to the full allowance.
+        users = [mock.Mock(is_authenticated=True, pk=f'{rate}-{n}') for n in range(keys)]
+        samples = []
+        with mock.patch('LittleLemonAPI.throttles.get_store', return_value=store):
+            for n in range(requests):
+                throttle = UserRateThrottle() if store is None else UserSlidingWindowThrottle()
+                throttle.num_requests, throttle.duration = rate, 3600
+                now = n * 0.5
+                throttle.timer = lambda: now
+                request = mock.Mock(user=users[n % keys])
+                with timer(samples):
+                    throttle.allow_request(request, None)
+
+        if store is None:
+            state = len(pickle.dumps(cache.get(throttle.key)))
+        else:
+            # One (current, previous) pair of integers, whatever the rate.
+            state = len(pickle.dumps((throttle.current, throttle.previous)))
+        return samples, state
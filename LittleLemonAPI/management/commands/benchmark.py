@@ -0,0 +1,234 @@
+import datetime
+import json
+import platform
+import sqlite3
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from LittleLemonAPI import carts, summaries, urls
+from LittleLemonAPI.bench import BENCH_PASSWORD, benchmark_database, seed_dataset, summarize, timer
+from LittleLemonAPI.models import Cart, Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.permissions import DELIVERY_CREW, MANAGER
+
+# (route in LittleLemonAPI/urls.py or djoser, method, path, role, body).
+# Every LittleLemonAPI route must appear here. Each request runs in a
+# savepoint that is rolled back, so writes never change the dataset.
+ROUTES = [
+    ('categories/', 'get', '/api/categories/', 'manager', None),
+    ('categories/', 'post', '/api/categories/', 'manager', {'title': 'Sides'}),
+    ('categories/<int:pk>/', 'get', '/api/categories/{category}/', 'manager', None),
+    ('categories/<int:pk>/', 'patch', '/api/categories/{category}/', 'manager', {'title': 'Mains'}),
+    ('menu-items', 'get', '/api/menu-items', None, None),
+    ('menu-items', 'post', '/api/menu-items', 'manager',
+     {'title': 'Soup', 'price': '4.50', 'category_id': '{category}'}),
+    ('menu-items/', 'get', '/api/menu-items/', None, None),
+    ('menu-items/', 'get', '/api/menu-items/?category=Category 1', None, None),
+    ('menu-items/<int:pk>/', 'get', '/api/menu-items/{menuitem}/', None, None),
+    ('menu-items/<int:pk>/', 'patch', '/api/menu-items/{menuitem}/', 'manager', {'price': '9.99'}),
+    ('menu-items/search/', 'get', '/api/menu-items/search/?q=grilled fsh', None, None),
+    ('menu/', 'get', '/api/menu/', None, None),
+    ('menu/import/', 'post', '/api/menu/import/', 'manager',
+     [{'title': 'Soup', 'price': '4.50', 'category': 'category-0'},
+      {'id': '{menuitem}', 'title': 'Penne', 'price': '9.50', 'category': 'category-0'}]),
+    ('menu/export/', 'get', '/api/menu/export/?format=csv', 'manager', None),
+    ('groups/manager/users/', 'get', '/api/groups/manager/users/', 'manager', None),
+    ('groups/manager/users/', 'post', '/api/groups/manager/users/', 'manager', {'username': 'bench-customer'}),
+    ('groups/manager/users/<int:userId>/', 'delete', '/api/groups/manager/users/{manager}/', 'manager', None),
+    ('groups/delivery-crew/users/', 'get', '/api/groups/delivery-crew/users/', 'manager', None),
+    ('groups/delivery-crew/users/', 'post', '/api/groups/delivery-crew/users/', 'manager',
+     {'username': 'bench-customer'}),
+    ('groups/delivery-crew/users/<int:userId>/', 'delete', '/api/groups/delivery-crew/users/{crew}/',
+     'manager', None),
+    ('cart/menu-items/', 'get', '/api/cart/menu-items/', 'customer', None),
+    ('cart/menu-items/', 'post', '/api/cart/menu-items/', 'customer', {'menuitem_id': '{menuitem}', 'quantity': 2}),
+    ('cart/menu-items/', 'delete', '/api/cart/menu-items/', 'customer', None),
+    ('orders/', 'get', '/api/orders/', 'manager', None),
+    ('orders/', 'get', '/api/orders/', 'crew', None),
+    ('orders/', 'get', '/api/orders/', 'customer', None),
+    ('orders/', 'post', '/api/orders/', 'customer', None),
+    ('orders/export/', 'get', '/api/orders/export/?date_from=2024-12-01', 'manager', None),
+    ('orders/dispatch/', 'post', '/api/orders/dispatch/', 'manager',
+     {'assignments': [{'order': '{order}', 'delivery_crew': 'bench-crew'}]}),
+    ('orders/dispatch/', 'post', '/api/orders/dispatch/', 'manager', {'mode': 'auto'}),
+    ('orders/status/', 'post', '/api/orders/status/', 'crew', {'orders': ['{order}'], 'status': 1}),
+    ('orders/status/', 'post', '/api/orders/status/', 'manager', {'orders': ['{order}'], 'status': 'unassigned'}),
+    ('orders/<int:pk>/', 'get', '/api/orders/{order}/', 'customer', None),
+    ('orders/<int:pk>/', 'patch', '/api/orders/{order}/', 'manager', {'delivery_crew': 'bench-crew', 'status': 0}),
+    ('orders/<int:pk>/', 'delete', '/api/orders/{order}/', 'manager', None),
+    ('analytics/sales/', 'get', '/api/analytics/sales/?group_by=category', 'manager', None),
+    ('metrics/', 'get', '/api/metrics/', 'manager', None),
+    ('users/', 'post', '/auth/users/', None,
+     {'username': 'bench-new', 'password': BENCH_PASSWORD, 'email': 'new@example.com'}),
+    ('users/me/', 'get', '/auth/users/me/', 'customer', None),
+    ('token/login/', 'post', '/auth/token/login/', None, {'username': 'bench-customer', 'password': BENCH_PASSWORD}),
+    ('token/logout/', 'post', '/auth/token/logout/', 'customer', None),
+]
+
+
+def format_value(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {key: format_value(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [format_value(item, ids) for item in value]
+    return value
+
+
+class Command(BaseCommand):
+    help = 'Seed a scale dataset and report latency, queries and peak memory for every API route.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Dataset size relative to 10k menu items, 100k users and 1M orders.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset.')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed requests per endpoint.')
+        parser.add_argument('--output', default='benchmark-results.json', help='Where to write the JSON results.')
+        parser.add_argument('--compare', help='Earlier results file to print p50/p95 changes against.')
+
+    def handle(self, *args, **options):
+        missing = {str(pattern.pattern) for pattern in urls.urlpatterns} - {route[0] for route in ROUTES}
+        if missing:
+            raise CommandError(f'No benchmark for: {", ".join(sorted(missing))}')
+
+        with benchmark_database():
+            started = datetime.datetime.now()
+            counts = seed_dataset(options['scale'], options['seed'], progress=self.progress)
+            self.stdout.write(f'\nSeeded {counts} in {(datetime.datetime.now() - started).seconds}s')
+            results = self.run(self.prepare(), options['repeat'])
+
+        report = {
+            'meta': {
+                'timestamp': started.isoformat(timespec='seconds'),
+                'scale': options['scale'],
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+                'dataset': counts,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                rows = json.load(baseline)['results']
+                previous = dict(zip(self.keys(rows), rows))
+
+        self.stdout.write(f'{"endpoint":<58} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>7} {"peak KiB":>9}')
+        for key, row in zip(self.keys(results), results):
+            line = (f'{key:<58} {row["p50"]:>8.2f} {row["p95"]:>8.2f} {row["p99"]:>8.2f} '
+                    f'{row["queries"]:>7} {row["peak_kib"]:>9.1f}')
+            before = previous.get(key)
+            if before:
+                line += f'  p50 {row["p50"] - before["p50"]:+.2f} p95 {row["p95"] - before["p95"]:+.2f}'
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+    def progress(self, name, done):
+        self.stdout.write(f'Seeding {name}: {done:<10}', ending='\r')
+
+    def keys(self, rows):
+        # Routes measured more than once with different bodies are numbered
+        # in ROUTES order.
+        seen = {}
+        for row in rows:
+            key = f'{row["method"].upper()} {row["path"]} [{row["role"] or "anonymous"}]'
+            seen[key] = seen.get(key, 0) + 1
+            yield key if seen[key] == 1 else f'{key} #{seen[key]}'
+
+    def prepare(self):
+        """Tokens for each role and the ids the route paths refer to."""
+        customer = User.objects.get(username='bench-customer')
+        crew = User.objects.get(username='bench-crew')
+        item = MenuItem.objects.select_related('category').order_by('pk').first()
+        order = Order(user=customer, delivery_crew=crew, status=0, total=item.price)
+        line = OrderItem(order=order, menuitem=item, quantity=1, unit_price=item.price, price=item.price)
+        summaries.summarize(order, [line])
+        order.save()
+        line.save()
+        Cart.objects.bulk_create(
+            Cart(user=customer, menuitem=menuitem, quantity=1, unit_price=menuitem.price)
+            for menuitem in MenuItem.objects.order_by('pk')[1:6]
+        )
+        self.customer = customer
+        users = {'manager': User.objects.get(username='bench-manager'), 'crew': crew, 'customer': customer}
+        self.tokens = {role: Token.objects.create(user=user).key for role, user in users.items()}
+        return {
+            'category': Category.objects.create(title='Spare').pk,
+            'menuitem': item.pk,
+            'order': order.pk,
+            'manager': User.objects.filter(groups__name=MANAGER).order_by('-pk').first().pk,
+            'crew': User.objects.filter(groups__name=DELIVERY_CREW).order_by('-pk').first().pk,
+        }
+
+    def run(self, ids, repeat):
+        results = []
+        # Nothing the benchmark does is committed; each request's writes are
+        # rolled back before the next one.
+        with transaction.atomic():
+            for route, method, path, role, body in ROUTES:
+                # Results keep the path template, so runs at other scales,
+                # with other ids, still line up.
+                results.append(dict(
+                    {'route': route, 'method': method, 'path': path, 'role': role},
+                    **self.measure(method, format_value(path, ids), role, format_value(body, ids), repeat)
+                ))
+        return results
+
+    @contextmanager
+    def rolled_back(self):
+        sid = transaction.savepoint()
+        try:
+            yield
+        finally:
+            transaction.savepoint_rollback(sid)
+            # Cached carts are not rolled back with the database.
+            carts.get_store().evict(self.customer)
+
+    def request(self, method, path, role, body):
+        client = APIClient()
+        if role:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[role]}')
+        response = getattr(client, method)(path, body, format='json')
+        content = b''.join(response) if response.streaming else response.content
+        if response.status_code >= 400:
+            raise CommandError(f'{method.upper()} {path} returned {response.status_code}: {content[:200]}')
+        return response
+
+    def measure(self, method, path, role, body, repeat):
+        # One untimed request warms the caches, as in a running server.
+        with self.rolled_back():
+            self.request(method, path, role, body)
+
+        samples, queries = [], []
+        for _ in range(repeat):
+            with self.rolled_back():
+                with CaptureQueriesContext(connection) as captured, timer(samples):
+                    self.request(method, path, role, body)
+            queries.append(len(captured))
+
+        # tracemalloc slows everything down, so memory gets its own pass.
+        tracemalloc.start()
+        try:
+            with self.rolled_back():
+                self.request(method, path, role, body)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        stats = summarize(samples)
+        stats.update(queries=max(queries), peak_kib=peak / 1024)
+        return stats
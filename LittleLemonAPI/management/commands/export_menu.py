@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import catalog
+from LittleLemonAPI.renderers import CSVRenderer, NDJSONRenderer
+
+
+class Command(BaseCommand):
+    help = 'Export every menu item in the format import_menu reads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(catalog.PARSERS), default='csv')
+        parser.add_argument('--output', help='File to write; defaults to standard output.')
+
+    def handle(self, *args, **options):
+        if options['format'] == 'csv':
+            content = CSVRenderer().render_rows(catalog.export_rows(), catalog.FIELDS)
+        else:
+            renderer = NDJSONRenderer()
+            content = (renderer.render_row(row) for row in catalog.export_rows())
+
+        if not options['output']:
+            for chunk in content:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+        with open(options['output'], 'wb') as output:
+            for chunk in content:
+                output.write(chunk)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import carts
+
+
+class Command(BaseCommand):
+    help = 'Write carts left idle in the cart store back to the Cart table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Write back every changed cart, idle or not, e.g. before clearing the cache.')
+
+    def handle(self, *args, **options):
+        written = carts.get_store().sweep(force=options['all'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote back {written} carts.'))
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI import catalog
+
+
+class Command(BaseCommand):
+    help = 'Import menu items and categories from a CSV or NDJSON file (see LittleLemonAPI/catalog.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for standard input.')
+        parser.add_argument('--format', choices=sorted(catalog.PARSERS),
+                            help='Input format; defaults to the file extension.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without writing.')
+        parser.add_argument('--batch-size', type=int, default=catalog.BATCH_SIZE,
+                            help='Rows applied per transaction.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if input_format not in catalog.PARSERS:
+            raise CommandError('Pass --format csv or --format ndjson.')
+
+        importer = catalog.MenuImport(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            report = importer.run(catalog.PARSERS[input_format](catalog.read_lines(stream)))
+        except catalog.CatalogFormatError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        for error in report['errors']:
+            self.stderr.write(f'line {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would import" if report["dry_run"] else "Imported"} {report["rows"]} rows: '
+            f'{report["created"]["menu_items"]} menu items and {report["created"]["categories"]} categories created, '
+            f'{report["updated"]["menu_items"]} menu items and {report["updated"]["categories"]} categories updated, '
+            f'{len(report["errors"])} errors.'
+        ))
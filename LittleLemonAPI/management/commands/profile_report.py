@@ -0,0 +1,79 @@
+import json
+import pstats
+import re
+import statistics
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI import profiling
+
+DURATION = re.compile(r'-(\d+)ms-')
+
+
+class Command(BaseCommand):
+    help = 'Summarize the hottest functions per view and the slowest queries captured by the profiler.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', help='Capture directory; defaults to PROFILING["DIRECTORY"].')
+        parser.add_argument('--view', action='append', help='Only this view (repeatable), e.g. OrderView.')
+        parser.add_argument('--limit', type=int, default=15, help='Functions per view and queries to show.')
+        parser.add_argument('--sort', choices=['cumulative', 'tottime'], default='cumulative',
+                            help='Rank functions by time including or excluding their callees.')
+
+    def handle(self, *args, **options):
+        directory = Path(options['directory'] or profiling.get_config()['DIRECTORY'])
+        if not directory.is_dir():
+            raise CommandError(f'No captures in {directory}.')
+
+        views = sorted(path for path in directory.iterdir() if path.is_dir())
+        if options['view']:
+            views = [path for path in views if path.name in options['view']]
+        for path in views:
+            self.report_view(path, options['limit'], options['sort'])
+        self.report_queries(directory, options['view'], options['limit'])
+
+    def report_view(self, path, limit, sort):
+        files = sorted(path.glob('*.prof'))
+        if not files:
+            return
+        durations = [int(match.group(1)) for match in map(DURATION.search, (f.name for f in files)) if match]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{path.name}: {len(files)} profiles, median {statistics.median(durations):.0f} ms, '
+            f'max {max(durations)} ms' if durations else f'{path.name}: {len(files)} profiles'
+        ))
+        stats = pstats.Stats(*map(str, files), stream=self.stdout)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+    def report_queries(self, directory, views, limit):
+        queries = {}
+        for name in (profiling.SLOW_QUERY_LOG + '.1', profiling.SLOW_QUERY_LOG):
+            path = directory / name
+            if not path.exists():
+                continue
+            with open(path) as log:
+                for line in log:
+                    entry = json.loads(line)
+                    if views and entry['view'] not in views:
+                        continue
+                    # Statements are logged with placeholders, so repeats of
+                    # one query group together whatever their parameters.
+                    query = queries.setdefault(
+                        entry['sql'], {'count': 0, 'total': 0.0, 'views': set(), 'slowest': entry}
+                    )
+                    query['count'] += 1
+                    query['total'] += entry['duration_ms']
+                    query['views'].add(entry['view'] or '-')
+                    if entry['duration_ms'] > query['slowest']['duration_ms']:
+                        query['slowest'] = entry
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Slow queries: {len(queries)} distinct statements'))
+        ranked = sorted(queries.items(), key=lambda item: item[1]['total'], reverse=True)[:limit]
+        for sql, query in ranked:
+            self.stdout.write(
+                f'{query["total"]:>10.1f} ms total {query["count"]:>6}x  max {query["slowest"]["duration_ms"]:.1f} ms'
+                f'  in {", ".join(sorted(query["views"]))}'
+            )
+            self.stdout.write(f'    {sql}')
+            for step in query['slowest']['plan']:
+                self.stdout.write(f'      plan: {step}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from LittleLemonAPI import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailySales rollup table from order history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Orders aggregated per batch.')
+
+    def handle(self, *args, **options):
+        done = 0
+        with transaction.atomic():
+            for done in rollups.rebuild(options['batch_size']):
+                self.stdout.write(f'{done} orders rolled up', ending='\r')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups from {done} orders.'))
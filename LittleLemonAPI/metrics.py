@@ -0,0 +1,158 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+PerformanceMiddleware times each request and feeds the histograms below.
+Every worker process keeps its own, so scrape each worker (or sum across
+them) for the whole picture. An observation is one bisect and one short
+lock, cheap enough to leave on in production.
+"""
+import bisect
+import math
+import threading
+import time
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+PHASES = ('total', 'db', 'app', 'render')
+
+# The timings of the request being handled. Context variables follow the
+# request into sync_to_async threads, so async views are counted too.
+current_timings = ContextVar('current_timings', default=None)
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+def format_number(value):
+    return '+Inf' if value == math.inf else repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self):
+        with self.lock:
+            snapshot = sorted((labels, list(counts), total) for labels, (counts, total) in self.series.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label_values, counts, total in snapshot:
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{format_number(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total!r}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self.lock:
+            self.series[label_values] = self.series.get(label_values, 0) + 1
+
+    def collect(self):
+        with self.lock:
+            snapshot = sorted(self.series.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for label_values, value in snapshot:
+            lines.append(f'{self.name}{{{format_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+
+REQUEST_SECONDS = Histogram(
+    'littlelemon_request_duration_seconds',
+    'Request time by phase: total, db (SQL), app (view code and serialization) and render.',
+    ('view', 'method', 'phase'), LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'littlelemon_request_queries', 'SQL queries per request.', ('view', 'method'), QUERY_BUCKETS,
+)
+RESPONSES = Counter('littlelemon_responses_total', 'Responses by status code.', ('view', 'method', 'status'))
+REGISTRY = [REQUEST_SECONDS, REQUEST_QUERIES, RESPONSES]
+
+
+def render():
+    return '\n'.join(line for metric in REGISTRY for line in metric.collect()) + '\n'
+
+
+def clear():
+    for metric in REGISTRY:
+        metric.clear()
+
+
+class RequestTimings:
+    """Clock readings and SQL totals for one request."""
+    __slots__ = ('start', 'view', 'view_start', 'view_end', 'queries', 'query_time')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view = None
+        # (clock, query_time) when the view was called and when it returned
+        # a response still to be rendered.
+        self.view_start = self.view_end = None
+        self.queries = 0
+        self.query_time = 0.0
+
+    def mark(self):
+        return time.perf_counter(), self.query_time
+
+    def phases(self, end):
+        """Seconds spent in each of PHASES, given when the response was ready."""
+        view_start = self.view_start or (self.start, 0.0)
+        view_end = self.view_end or (end, self.query_time)
+        app = view_end[0] - view_start[0] - (view_end[1] - view_start[1])
+        return {'total': end - self.start, 'db': self.query_time, 'app': max(app, 0.0), 'render': end - view_end[0]}
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's timings."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.query_time += time.perf_counter() - start
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
@@ -0,0 +1,133 @@
+import cProfile
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from LittleLemonAPI import metrics, profiling
+
+
+def view_name(view_func):
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown')
+    if getattr(view_class, 'view_is_async', False):
+        return f'{view_class.__name__} (async)'
+    return view_class.__name__
+
+
+class PerformanceMiddleware:
+    """
+    Times every request and reports it twice: in a Server-Timing header on
+    the response, and in the histograms of metrics.py, labelled with the
+    view class.
+
+    The phases are the whole request, SQL (through a database execute
+    wrapper, see metrics.install), the view itself less its SQL, which is
+    mostly serialization, and rendering the response. Keep it first in
+    MIDDLEWARE so the total covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = metrics.RequestTimings()
+        token = metrics.current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = metrics.RequestTimings()
+        token = metrics.current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = metrics.current_timings.get()
+        if timings is not None:
+            timings.view = view_name(view_func)
+            timings.view_start = timings.mark()
+
+    def process_template_response(self, request, response):
+        # Runs once the view has returned and before the response is
+        # rendered; DRF's Response is a template response.
+        timings = metrics.current_timings.get()
+        if timings is not None:
+            timings.view_end = timings.mark()
+        return response
+
+    def finish(self, request, response, timings):
+        phases = timings.phases(time.perf_counter())
+        view = timings.view or 'unresolved'
+        for phase in metrics.PHASES:
+            metrics.REQUEST_SECONDS.observe(phases[phase], view, request.method, phase)
+        metrics.REQUEST_QUERIES.observe(timings.queries, view, request.method)
+        metrics.RESPONSES.inc(view, request.method, response.status_code)
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={phases["total"] * 1000:.2f}',
+            f'db;dur={phases["db"] * 1000:.2f};desc="{timings.queries} queries"',
+            f'app;dur={phases["app"] * 1000:.2f}',
+            f'render;dur={phases["render"] * 1000:.2f}',
+        ])
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    cProfiles a sample of requests, and with PROFILING['SLOW_REQUEST_MS']
+    set, every request that takes that long; see profiling.py.
+
+    Only requests served synchronously are profiled: under ASGI a profiler
+    on the event loop would also catch every other request in flight.
+    Slow queries are logged either way, by profiling.record_slow_query.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+
+        config = profiling.get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+        sampled = random.random() < config['SAMPLE_RATE']
+        if not sampled and config['SLOW_REQUEST_MS'] is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage) is already running.
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        if sampled or duration * 1000 >= config['SLOW_REQUEST_MS']:
+            match = request.resolver_match
+            profiling.save_profile(profiler, view_name(match.func) if match else 'unresolved', duration, config)
+        return response
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from LittleLemonAPI import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor)
+    MenuItem = apps.get_model('LittleLemonAPI', 'MenuItem')
+    search.rebuild_index(MenuItem.objects.using(schema_editor.connection.alias))
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0007_alter_order_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def deduplicate_slugs(apps, schema_editor):
+    Category = apps.get_model('LittleLemonAPI', 'Category')
+    taken = set()
+    for category in Category.objects.order_by('pk'):
+        base = category.slug or slugify(category.title) or 'category'
+        slug, suffix = base, 2
+        while slug in taken:
+            slug, suffix = f'{base}-{suffix}', suffix + 1
+        taken.add(slug)
+        if slug != category.slug:
+            category.slug = slug
+            category.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0008_menuitem_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(unique=True),
+        ),
+    ]
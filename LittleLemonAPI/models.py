@@ -1,15 +1,38 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils.text import slugify
 
 # Create your models here.
+def unique_slug(model, title, exclude_pk=None):
+    base = slugify(title) or 'category'
+    taken = set(
+        model.objects.filter(slug__startswith=base).exclude(pk=exclude_pk).values_list('slug', flat=True)
+    )
+    slug, suffix = base, 2
+    while slug in taken:
+        slug, suffix = f'{base}-{suffix}', suffix + 1
+    return slug
+
+
 class Category(models.Model):
-    slug = models.SlugField()
+    slug = models.SlugField(unique=True)
     title = models.CharField(max_length=255, db_index=True)
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(Category, self.title, exclude_pk=self.pk)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
 
+class CatalogVersion(models.Model):
+    # A single row whose version changes with every catalog change, for
+    # worker processes that do not share a cache; see cache.py.
+    version = models.BigIntegerField(default=0)
+
+
 class MenuItem(models.Model):
     title = models.CharField(max_length=255, db_index=True)
     price = models.DecimalField(max_digits=6, decimal_places=2, db_index=True)
@@ -21,13 +44,26 @@ class MenuItem(models.Model):
 
 
 class Cart(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # The unique index leads with user, which is how carts are read.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.SmallIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
 
     class Meta:
-        unique_together = ('menuitem', 'user')
+        unique_together = ('user', 'menuitem')
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        # Everything OrderSerializer touches on orders without a summary, in
+        # three queries regardless of how many orders or lines are loaded.
+        return self.select_related('user', 'delivery_crew').prefetch_related(
+            models.Prefetch(
+                'orderitem_set',
+                queryset=OrderItem.objects.select_related('menuitem__category'),
+            )
+        )
 
 
 class Order(models.Model):
@@ -36,12 +72,41 @@ class Order(models.Model):
         (1, 'Delivered')
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    delivery_crew = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="delivery_crew", null=True)
-    status = models.SmallIntegerField(choices=STATUS_CHOICES, db_index=True, null=True)
-    total = models.DecimalField(max_digits=6, decimal_places=2)
+    # user, delivery_crew and status are indexed through the composite
+    # indexes below, which lead with them.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    delivery_crew = models.ForeignKey(
+        User, on_delete=models.SET_NULL, related_name="delivery_crew", null=True, db_index=False
+    )
+    status = models.SmallIntegerField(choices=STATUS_CHOICES, null=True)
+    total = models.DecimalField(max_digits=6, decimal_places=2, db_index=True)
     date = models.DateField(auto_now_add=True, db_index=True)
 
+    # What the order shows of its customer, crew and lines, kept on the row
+    # so lists render without joins; see summaries.py. lines is None until
+    # the order is summarized.
+    customer_username = models.CharField(max_length=150, blank=True, default='')
+    customer_email = models.EmailField(blank=True, default='')
+    crew_username = models.CharField(max_length=150, blank=True, default='')
+    crew_email = models.EmailField(blank=True, default='')
+    item_count = models.PositiveIntegerField(default=0)
+    lines = models.JSONField(null=True, blank=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A customer's orders, by date (the id tie-breaker rides along).
+            models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+            # A crew member's orders by date, and unassigned orders oldest
+            # first for dispatch.
+            models.Index(fields=['delivery_crew', 'date'], name='order_crew_date_idx'),
+            # Open load per crew member and crew status updates.
+            models.Index(fields=['delivery_crew', 'status'], name='order_crew_status_idx'),
+            # Export and search by status over a date range.
+            models.Index(fields=['status', 'date'], name='order_status_date_idx'),
+        ]
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
@@ -51,4 +116,14 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2)
 
     class Meta:
-        unique_together = ('order', 'menuitem')
\ No newline at end of file
+        unique_together = ('order', 'menuitem')
+
+class DailySales(models.Model):
+    date = models.DateField()
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'menuitem')
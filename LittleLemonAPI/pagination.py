@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+from types import SimpleNamespace
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (ordering field, id).
+
+    Each page seeks past the last row of the previous one with an indexed
+    range predicate instead of an OFFSET, so deep pages cost the same as the
+    first. The ordering field comes from OrderingFilter when the client asks
+    for one of the view's ordering_fields; the id tie-breaker keeps the
+    order stable when many rows share a value.
+
+    Pass ``?paginate=false`` to get the full, unpaginated list.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    paginate_query_param = 'paginate'
+    ordering = '-id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.build_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the sliced queryset for the requested page, or None if the
+        client opted out. Kept separate from evaluation so callers can fetch
+        the rows however they like before handing them to build_page().
+        """
+        if request.query_params.get(self.paginate_query_param, '').lower() in ('false', '0', 'off'):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        self.model_field = queryset.model._meta.get_field(self.field)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor[2]
+
+        descending = self.descending != reverse
+        if self.cursor is not None:
+            value, pk, _ = self.cursor
+            if descending:
+                position = Q(**{f'{self.field}__lte': value}) & (Q(**{f'{self.field}__lt': value}) | Q(pk__lt=pk))
+            else:
+                position = Q(**{f'{self.field}__gte': value}) & (Q(**{f'{self.field}__gt': value}) | Q(pk__gt=pk))
+            queryset = queryset.filter(position)
+
+        prefix = '-' if descending else ''
+        return queryset.order_by(prefix + self.field, prefix + 'pk')[:self.page_size + 1]
+
+    def build_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        reverse = self.cursor is not None and self.cursor[2]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self.position(rows[-1], reverse=False)
+            if self.cursor is not None and (has_more or not reverse):
+                self.previous_position = self.position(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_position),
+            'previous': self.get_link(self.previous_position),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        if view is not None and OrderingFilter in getattr(view, 'filter_backends', []):
+            ordering = OrderingFilter().get_ordering(request, queryset, view)
+        term = ordering[0] if ordering else self.ordering
+        return term.lstrip('-'), term.startswith('-')
+
+    def position(self, row, reverse):
+        if isinstance(row, dict):
+            # A .values() row from a ValuesSerializer read path.
+            row = SimpleNamespace(pk=row['id'], **{self.model_field.attname: row[self.model_field.attname]})
+        return (self.model_field.value_to_string(row), row.pk, reverse)
+
+    def get_link(self, position):
+        if position is None:
+            return None
+        value, pk, reverse = position
+        payload = json.dumps({'v': value, 'id': pk, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = self.model_field.to_python(payload['v'])
+            return value, int(payload['id']), bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class OrderPagination(KeysetPagination):
+    ordering = '-date'
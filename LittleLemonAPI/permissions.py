@@ -1,23 +1,80 @@
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from LittleLemonAPI.cache import is_shared
+
+MANAGER = 'manager'
+DELIVERY_CREW = 'delivery-crew'
+
+ROLE_CACHE_TIMEOUT = 60 * 15
+# Without a shared cache, invalidate_roles() only reaches this process, so
+# other workers may keep a revoked role for this long.
+LOCAL_ROLE_CACHE_TIMEOUT = 5
+
+
+def role_cache_key(user_id):
+    return 'roles:%s' % user_id
+
+
+def role_cache_timeout():
+    return ROLE_CACHE_TIMEOUT if is_shared() else LOCAL_ROLE_CACHE_TIMEOUT
+
+
+def get_roles(user):
+    """
+    Return the set of group names for ``user``.
+
+    Roles are memoized on the user object, which lives for one request, and
+    shared across requests through the cache. signals.py drops the cached
+    entry whenever the user's group membership changes; with a per-process
+    cache that only reaches this worker, so entries there expire after
+    LOCAL_ROLE_CACHE_TIMEOUT seconds instead of ROLE_CACHE_TIMEOUT.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    if not hasattr(user, '_role_cache'):
+        roles = cache.get(role_cache_key(user.pk))
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            cache.set(role_cache_key(user.pk), roles, role_cache_timeout())
+        user._role_cache = roles
+    return user._role_cache
+
+
+async def aget_roles(user):
+    """Async counterpart of get_roles(), sharing its memo and cache entry."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    if not hasattr(user, '_role_cache'):
+        roles = await cache.aget(role_cache_key(user.pk))
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            await cache.aset(role_cache_key(user.pk), roles, role_cache_timeout())
+        user._role_cache = roles
+    return user._role_cache
+
+
+def invalidate_roles(user_ids):
+    cache.delete_many([role_cache_key(user_id) for user_id in user_ids])
+
+
 class IsManagerOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         if request.method in SAFE_METHODS:
             return True
-        return request.user and request.user.groups.filter(name='manager').exists()
-    
+        return in_group(request.user, MANAGER)
+
 class IsManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="manager").exists()
+        return in_group(request.user, MANAGER)
 
 class IsDeliveryCrew(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="delivery-crew").exists()
+        return in_group(request.user, DELIVERY_CREW)
 
 class IsCustomer(BasePermission):
     def has_permission(self, request, view):
-        return not (request.user.groups.filter(name="manager").exists() or 
-                    request.user.groups.filter(name="delivery-crew").exists())
-    
+        return not get_roles(request.user) & {MANAGER, DELIVERY_CREW}
+
 def in_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    return group_name in get_roles(user)
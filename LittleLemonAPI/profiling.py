@@ -0,0 +1,138 @@
+"""
+Opt-in request profiling and slow-query logging, configured by the
+PROFILING setting (see settings.py).
+
+Profiled requests are written as cProfile files under
+``DIRECTORY/<view>/``, keeping the newest MAX_FILES_PER_VIEW per view.
+Queries slower than SLOW_QUERY_MS are logged with their query plan and
+appended to ``DIRECTORY/slow-queries.jsonl``. ``manage.py profile_report``
+summarizes both.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError
+from django.dispatch import receiver
+
+from LittleLemonAPI.metrics import current_timings
+
+DEFAULTS = {
+    'ENABLED': False,
+    # Share of requests profiled and kept whatever their latency.
+    'SAMPLE_RATE': 0.01,
+    # When set, every request is profiled and kept if it took at least this
+    # long. cProfile roughly doubles the cost of Python code, so only set it
+    # while chasing a slowdown.
+    'SLOW_REQUEST_MS': None,
+    'SLOW_QUERY_MS': 100,
+    'DIRECTORY': 'profiles',
+    'MAX_FILES_PER_VIEW': 50,
+    'MAX_LOG_BYTES': 5 * 1024 * 1024,
+}
+SLOW_QUERY_LOG = 'slow-queries.jsonl'
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+
+logger = logging.getLogger(__name__)
+log_lock = threading.Lock()
+# Set while a slow query is being explained, so the EXPLAIN is not timed.
+explaining = ContextVar('explaining', default=False)
+
+_config = None
+
+
+def get_config():
+    global _config
+    if _config is None:
+        _config = dict(DEFAULTS, **getattr(settings, 'PROFILING', {}))
+        _config['DIRECTORY'] = Path(_config['DIRECTORY'])
+    return _config
+
+
+@receiver(setting_changed)
+def reset_config(setting, **kwargs):
+    global _config
+    if setting == 'PROFILING':
+        _config = None
+
+
+def view_directory(config, view):
+    return config['DIRECTORY'] / re.sub(r'[^\w.-]+', '_', view)
+
+
+def save_profile(profiler, view, duration, config):
+    directory = view_directory(config, view)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{duration * 1000:.0f}ms-{os.getpid()}-{uuid.uuid4().hex[:6]}.prof'
+    profiler.dump_stats(directory / name)
+
+    files = sorted(directory.glob('*.prof'), key=lambda path: path.stat().st_mtime)
+    for path in files[:-config['MAX_FILES_PER_VIEW']]:
+        path.unlink(missing_ok=True)
+    return directory / name
+
+
+def explain(connection, sql, params):
+    if params is None or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    token = explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError:
+        return []
+    finally:
+        explaining.reset(token)
+
+
+def log_slow_query(connection, sql, params, duration, config, view=None):
+    entry = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'view': view,
+        'duration_ms': round(duration * 1000, 3),
+        'sql': sql,
+        'plan': explain(connection, sql, params),
+    }
+    logger.warning('Slow query (%.1f ms) in %s: %s | plan: %s',
+                   entry['duration_ms'], view or '-', sql, '; '.join(entry['plan']))
+
+    path = config['DIRECTORY'] / SLOW_QUERY_LOG
+    with log_lock:
+        config['DIRECTORY'].mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size > config['MAX_LOG_BYTES']:
+            path.replace(path.with_name(SLOW_QUERY_LOG + '.1'))
+        with open(path, 'a') as log:
+            log.write(json.dumps(entry) + '\n')
+
+
+def record_slow_query(execute, sql, params, many, context):
+    """Database execute wrapper logging statements slower than SLOW_QUERY_MS."""
+    config = get_config()
+    if not config['ENABLED'] or explaining.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if duration * 1000 >= config['SLOW_QUERY_MS']:
+        timings = current_timings.get()
+        log_slow_query(
+            context['connection'], sql, None if many else params, duration, config,
+            view=timings.view if timings is not None else None,
+        )
+    return result
+
+
+def install(connection):
+    if record_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_query)
@@ -0,0 +1,117 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core import checks
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Non-string keys are stringified as json does; dates and times are left to
+# DRF's encoder so their format does not change.
+ORJSON_OPTIONS = 0 if orjson is None else orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def fast_json_enabled():
+    return getattr(settings, 'FAST_JSON_RENDERING', False)
+
+
+@checks.register()
+def check_orjson(app_configs, **kwargs):
+    if fast_json_enabled() and orjson is None:
+        return [checks.Warning(
+            'FAST_JSON_RENDERING is on but orjson is not installed, so JSON is still rendered by DRF.',
+            hint='Install the dependencies from the Pipfile, which include orjson.',
+            id='LittleLemonAPI.W001',
+        )]
+    return []
+
+
+class Echo:
+    # csv.writer needs a file; this one hands each formatted line straight back.
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(self.render_row(row) for row in rows)
+
+    def render_row(self, row):
+        if orjson is not None and fast_json_enabled():
+            try:
+                return orjson.dumps(row, default=encoders.JSONEncoder().default, option=ORJSON_OPTIONS) + b'\n'
+            except TypeError:
+                pass
+        return json.dumps(
+            row, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')
+        ).encode(self.charset) + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        header = list(dict.fromkeys(key for row in rows for key in row))
+        return b''.join(self.render_rows(rows, header))
+
+    def render_rows(self, rows, header):
+        """Lazily yield the header and one encoded line per row dict."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(header).encode(self.charset)
+        for row in rows:
+            yield writer.writerow([row.get(key, '') for key in header]).encode(self.charset)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when FAST_JSON_RENDERING is on.
+
+    Output matches JSONRenderer's compact, unescaped-unicode form byte for
+    byte: dates and times go through DRF's own encoder, and U+2028/U+2029
+    are escaped the same way. The one known difference is floats in
+    exponent notation (orjson writes 1e16 where json writes 1e+16); the API
+    sends decimals as strings, so none reach the renderer. Anything orjson
+    cannot encode, indented output, and installs without orjson fall back
+    to JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or not fast_json_enabled() or data is None or not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type or '', renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encoders.JSONEncoder().default, option=ORJSON_OPTIONS)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Errors, such as the 403 for anyone but a manager.
+            data = ''.join(f'# {key}: {value}\n' for key, value in data.items())
+        return data.encode(self.charset)
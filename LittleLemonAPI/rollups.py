@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Count, Sum
+
+from LittleLemonAPI.models import DailySales, OrderItem
+
+BATCH_SIZE = 500
+
+
+def apply(rows):
+    """
+    Add ``(date, menuitem_id, quantity, revenue, orders)`` deltas to DailySales.
+
+    All rows go out in one INSERT ... ON CONFLICT DO UPDATE that increments
+    the existing counters, which SQLite and PostgreSQL both accept.
+    """
+    rows = list(rows)
+    ops = connection.ops
+    table = ops.quote_name(DailySales._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            params = []
+            for date, menuitem_id, quantity, revenue, orders in batch:
+                params += [ops.adapt_datefield_value(date), menuitem_id, quantity,
+                           ops.adapt_decimalfield_value(revenue, 12, 2), orders]
+            cursor.execute(
+                f'INSERT INTO {table} (date, menuitem_id, quantity, revenue, orders) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT (date, menuitem_id) DO UPDATE SET '
+                f'quantity = {table}.quantity + excluded.quantity, '
+                f'revenue = {table}.revenue + excluded.revenue, '
+                f'orders = {table}.orders + excluded.orders',
+                params
+            )
+
+
+def record_order(order, order_items, sign=1):
+    """Add an order's lines to the rollups, or remove them with ``sign=-1``."""
+    totals = defaultdict(lambda: [0, 0, 0])
+    for item in order_items:
+        row = totals[item.menuitem_id]
+        row[0] += item.quantity
+        row[1] += item.price
+        row[2] += 1
+    apply(
+        (order.date, menuitem_id, sign * quantity, sign * revenue, sign * orders)
+        for menuitem_id, (quantity, revenue, orders) in totals.items()
+    )
+
+
+def rebuild(batch_size=10000):
+    """
+    Recompute every rollup from OrderItem history, one batch of orders at a
+    time. Call inside a transaction so readers never see a partial rebuild.
+    Yields the number of orders folded in after each batch.
+    """
+    DailySales.objects.all().delete()
+    last_id, done = 0, 0
+    while True:
+        ids = list(
+            OrderItem.objects.filter(order_id__gt=last_id).order_by('order_id')
+            .values_list('order_id', flat=True).distinct()[:batch_size]
+        )
+        if not ids:
+            return
+        apply(
+            (row['order__date'], row['menuitem_id'], row['quantity'], row['revenue'], row['orders'])
+            for row in OrderItem.objects.filter(order_id__gte=ids[0], order_id__lte=ids[-1])
+            .values('order__date', 'menuitem_id').order_by()
+            .annotate(quantity=Sum('quantity'), revenue=Sum('price'), orders=Count('id'))
+        )
+        last_id, done = ids[-1], done + len(ids)
+        yield done
@@ -0,0 +1,115 @@
+import difflib
+import re
+
+from django.db import connection
+
+SEARCH_TABLE = 'LittleLemonAPI_menuitem_search'
+VOCAB_TABLE = 'LittleLemonAPI_menuitem_search_vocab'
+BATCH_SIZE = 1000
+
+# Title matches count ten times as much as category matches.
+RANK = f'bm25("{SEARCH_TABLE}", 10.0, 1.0)'
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def create_index(schema_editor):
+    if not is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE "{SEARCH_TABLE}" USING fts5('
+        f"title, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(f'CREATE VIRTUAL TABLE "{VOCAB_TABLE}" USING fts5vocab("{SEARCH_TABLE}", \'row\')')
+
+
+def drop_index(schema_editor):
+    if not is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS "{VOCAB_TABLE}"')
+    schema_editor.execute(f'DROP TABLE IF EXISTS "{SEARCH_TABLE}"')
+
+
+def index_menu_items(rows):
+    """Insert or replace index entries from (id, title, category title) rows."""
+    if not is_supported():
+        return
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            cursor.execute(
+                f'DELETE FROM "{SEARCH_TABLE}" WHERE rowid IN ({", ".join(["%s"] * len(batch))})',
+                [row[0] for row in batch]
+            )
+            cursor.executemany(
+                f'INSERT INTO "{SEARCH_TABLE}" (rowid, title, category) VALUES (%s, %s, %s)', batch
+            )
+
+
+def remove_menu_items(ids):
+    if not is_supported():
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            cursor.execute(
+                f'DELETE FROM "{SEARCH_TABLE}" WHERE rowid IN ({", ".join(["%s"] * len(batch))})', batch
+            )
+
+
+def rebuild_index(menu_items):
+    """Replace the whole index with ``menu_items``, a MenuItem queryset."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{SEARCH_TABLE}"')
+    index_menu_items(
+        menu_items.values_list('pk', 'title', 'category__title').order_by('pk').iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())[:8]
+
+
+def expand_term(cursor, term):
+    """
+    Return the index terms a query term should match.
+
+    Known terms and prefixes of known terms are matched as prefixes. Anything
+    else is assumed to be a typo and replaced by the closest index terms that
+    share its first letter.
+    """
+    cursor.execute(
+        f'SELECT 1 FROM "{VOCAB_TABLE}" WHERE term >= %s AND term < %s LIMIT 1', [term, term + '\uffff']
+    )
+    if cursor.fetchone():
+        return [term]
+    cursor.execute(
+        f'SELECT term FROM "{VOCAB_TABLE}" WHERE term >= %s AND term < %s', [term[0], term[0] + '\uffff']
+    )
+    candidates = [row[0] for row in cursor.fetchall() if abs(len(row[0]) - len(term)) <= 2]
+    return difflib.get_close_matches(term, candidates, n=3, cutoff=0.7)
+
+
+def search_menu_item_ids(query, limit):
+    """Ids of the menu items matching ``query``, best match first."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    with connection.cursor() as cursor:
+        clauses = []
+        for term in terms:
+            matches = expand_term(cursor, term)
+            if not matches:
+                return []
+            clauses.append('(%s)' % ' OR '.join(f'"{match}"*' for match in matches))
+        cursor.execute(
+            f'SELECT rowid FROM "{SEARCH_TABLE}" WHERE "{SEARCH_TABLE}" MATCH %s ORDER BY {RANK} LIMIT %s',
+            [' AND '.join(clauses), limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
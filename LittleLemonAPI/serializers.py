@@ -1,11 +1,15 @@
 from rest_framework import serializers
+from LittleLemonAPI import carts
 from LittleLemonAPI.models import Category, MenuItem, Cart, Order, OrderItem
 from django.contrib.auth.models import User
+from django.db.models import Q, prefetch_related_objects
+from django.db.models.functions import Lower
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'slug', 'title']
+        extra_kwargs = {'slug': {'required': False}}
 
 class MenuItemSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
@@ -50,10 +54,67 @@ class AddUserToDeliveryGroupSerializer(serializers.Serializer):
         except User.DoesNotExist:
             raise serializers.ValidationError("User does not exist.")
         
+class MenuItemLookup:
+    """Resolves the menu items referenced by a batch of cart rows in one query."""
+
+    def __init__(self, rows):
+        ids, names = set(), set()
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            if row.get('menuitem_id') is not None:
+                try:
+                    ids.add(int(row['menuitem_id']))
+                except (TypeError, ValueError):
+                    pass
+            elif isinstance(row.get('menuitem_name'), str):
+                names.add(row['menuitem_name'].lower())
+
+        self.by_id, self.by_name = {}, {}
+        if not ids and not names:
+            return
+        items = MenuItem.objects.select_related('category').annotate(lower_title=Lower('title')) \
+            .filter(Q(pk__in=ids) | Q(lower_title__in=names)).order_by('pk')
+        for item in items:
+            self.by_id[item.pk] = item
+            self.by_name.setdefault(item.lower_title, item)
+
+
+class MenuItemLookupField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        lookup = self.context.get('menuitem_lookup')
+        if lookup is None:
+            return super().to_internal_value(data)
+        try:
+            return lookup.by_id[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class CartListSerializer(serializers.ListSerializer):
+    max_batch_size = 100
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', self.max_batch_size)
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) <= self.max_length:
+            self._context['menuitem_lookup'] = MenuItemLookup(data)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        # Later rows for the same menu item win, as with one POST per item.
+        rows = {data['menuitem'].pk: (data['menuitem'], data['quantity']) for data in validated_data}
+        return carts.get_store().add(self.context['request'].user, rows.values())
+
+
 class CartSerializer(serializers.ModelSerializer):
     menuitem = MenuItemSerializer(read_only=True)
-    menuitem_id = serializers.PrimaryKeyRelatedField(
-        queryset=MenuItem.objects.all(),
+    menuitem_id = MenuItemLookupField(
+        queryset=MenuItem.objects.select_related('category'),
         write_only=True,
         required=False
     )
@@ -66,16 +127,21 @@ class CartSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cart
         fields = ['id', 'menuitem', 'menuitem_id', 'menuitem_name', 'quantity', 'unit_price', 'price']
+        list_serializer_class = CartListSerializer
 
     def validate(self, data):
         menuitem = None
+        lookup = self.context.get('menuitem_lookup')
 
         if 'menuitem_id' in data:
             menuitem = data['menuitem_id']
         elif 'menuitem_name' in data:
             try:
-                menuitem = MenuItem.objects.get(title__iexact=data['menuitem_name'])
-            except MenuItem.DoesNotExist:
+                if lookup is not None:
+                    menuitem = lookup.by_name[data['menuitem_name'].lower()]
+                else:
+                    menuitem = MenuItem.objects.select_related('category').get(title__iexact=data['menuitem_name'])
+            except (KeyError, MenuItem.DoesNotExist):
                 raise serializers.ValidationError({'menuitem_name': 'Menu item not found.'})
         else:
             raise serializers.ValidationError('Either menuitem_id or menuitem_name is required.')
@@ -90,16 +156,7 @@ class CartSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         user = self.context['request'].user
-        menuitem = validated_data['menuitem']
-        quantity = validated_data['quantity']
-        unit_price = menuitem.price
-
-        cart_item, _ = Cart.objects.update_or_create(
-            user=user,
-            menuitem=menuitem,
-            defaults={'quantity': quantity, 'unit_price': unit_price}
-        )
-        return cart_item
+        return carts.get_store().add(user, [(validated_data['menuitem'], validated_data['quantity'])])[0]
     
     def get_price(self, obj):
         return obj.unit_price * obj.quantity
@@ -126,14 +183,33 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ['menuitem', 'quantity', 'unit_price', 'price']
 
 
+UNASSIGNED = {"username": "unassigned", "email": "unassigned"}
+
+
+class OrderListSerializer(serializers.ListSerializer):
+    # What OrderSerializer reads of an order that is not summarized yet.
+    unsummarized_lookups = ['user', 'delivery_crew', 'orderitem_set__menuitem__category']
+
+    def to_representation(self, data):
+        orders = list(data)
+        prefetch_related_objects([order for order in orders if order.lines is None], *self.unsummarized_lookups)
+        return super().to_representation(orders)
+
+
 class OrderSerializer(serializers.ModelSerializer):
+    """
+    Orders with a summary (see summaries.py) render from their own row;
+    older ones from their user, crew and lines, which with_details() loads
+    (and OrderListSerializer for a list of orders).
+    """
     customer = serializers.SerializerMethodField()
     delivery_crew = serializers.SerializerMethodField()
     status_display = serializers.SerializerMethodField()
-    items = OrderItemSerializer(source='orderitem_set', many=True)
+    items = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
+        list_serializer_class = OrderListSerializer
         fields = [
             'id',
             'customer',
@@ -146,14 +222,230 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
 
     def get_customer(self, obj):
+        if obj.lines is not None:
+            return {'username': obj.customer_username, 'email': obj.customer_email}
         return UserPublicSerializer(obj.user).data
 
     def get_delivery_crew(self, obj):
-        if obj.delivery_crew is None:
-            return {"username": "unassigned", "email": "unassigned"}
+        if obj.delivery_crew_id is None:
+            return dict(UNASSIGNED)
+        if obj.lines is not None:
+            return {'username': obj.crew_username, 'email': obj.crew_email}
         return UserPublicSerializer(obj.delivery_crew).data
 
     def get_status_display(self, obj):
-        if obj.delivery_crew is None or obj.status is None:
+        if obj.delivery_crew_id is None or obj.status is None:
             return "unassigned"
         return obj.get_status_display()
+
+    def get_items(self, obj):
+        if obj.lines is not None:
+            return obj.lines
+        return OrderItemSerializer(obj.orderitem_set.all(), many=True).data
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer over ``.values()`` rows.
+
+    For lists where building model instances and running ModelSerializer
+    fields costs more than the query itself. values() turns a queryset into
+    the rows to pass in, and each subclass renders exactly what its
+    ModelSerializer counterpart does for the same row.
+    """
+    fields = []
+
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.fields)
+
+    @property
+    def data(self):
+        if self.many:
+            return self.to_representation_many(list(self.instance))
+        return self.to_representation_many([self.instance])[0]
+
+    def to_representation_many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class MenuItemValuesSerializer(ValuesSerializer):
+    """MenuItemSerializer's output."""
+    fields = ['id', 'title', 'price', 'featured', 'category_id', 'category__slug', 'category__title']
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'price': '{:f}'.format(row['price']),
+            'featured': row['featured'],
+            'category': {'id': row['category_id'], 'slug': row['category__slug'], 'title': row['category__title']},
+        }
+
+
+class OrderValuesSerializer(ValuesSerializer):
+    """
+    OrderSerializer's output from the order row alone. The few orders not
+    summarized yet are read with with_details() and OrderSerializer.
+    """
+    fields = [
+        'id', 'customer_username', 'customer_email', 'delivery_crew_id', 'crew_username', 'crew_email',
+        'status', 'total', 'date', 'lines',
+    ]
+    status_labels = dict(Order.STATUS_CHOICES)
+
+    def to_representation_many(self, rows):
+        missing = [row['id'] for row in rows if row['lines'] is None]
+        self.fallback = {}
+        if missing:
+            for order in Order.objects.with_details().filter(pk__in=missing):
+                self.fallback[order.pk] = OrderSerializer(order).data
+            # Orders deleted since the page was read are left out.
+            rows = [row for row in rows if row['lines'] is not None or row['id'] in self.fallback]
+        return super().to_representation_many(rows)
+
+    def to_representation(self, row):
+        if row['lines'] is None:
+            return self.fallback[row['id']]
+        if row['delivery_crew_id'] is None:
+            crew = dict(UNASSIGNED)
+        else:
+            crew = {'username': row['crew_username'], 'email': row['crew_email']}
+        if row['delivery_crew_id'] is None or row['status'] is None:
+            status_display = 'unassigned'
+        else:
+            status_display = self.status_labels.get(row['status'], row['status'])
+        return {
+            'id': row['id'],
+            'customer': {'username': row['customer_username'], 'email': row['customer_email']},
+            'delivery_crew': crew,
+            'status': row['status'],
+            'status_display': status_display,
+            'total': '{:f}'.format(row['total']),
+            'date': row['date'].isoformat(),
+            'items': row['lines'],
+        }
+
+
+class OrderFilterSerializer(serializers.Serializer):
+    """
+    Validates the order list and export filters; see OrderFilterBackend.
+
+    ``delivery_crew`` and ``customer`` take a user id or username (a number
+    matches both), and ``delivery_crew`` also takes "unassigned". ``search`` is kept for old
+    clients: each word is an exact status (0 or 1) or crew username.
+    """
+    status = serializers.ChoiceField(choices=['0', '1', 'unassigned'], required=False)
+    delivery_crew = serializers.CharField(max_length=150, required=False)
+    customer = serializers.CharField(max_length=150, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    total_min = serializers.DecimalField(max_digits=6, decimal_places=2, required=False)
+    total_max = serializers.DecimalField(max_digits=6, decimal_places=2, required=False)
+    search = serializers.CharField(max_length=200, required=False, allow_blank=True)
+
+    def validate(self, data):
+        if 'date_from' in data and 'date_to' in data and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError('date_from must not be after date_to.')
+        if 'total_min' in data and 'total_max' in data and data['total_min'] > data['total_max']:
+            raise serializers.ValidationError('total_min must not be more than total_max.')
+        return data
+
+    def user_filter(self, field, value):
+        if value.isdigit():
+            # Usernames may be all digits too, so match either; the subquery
+            # keeps the order table on its user index.
+            users = User.objects.filter(Q(pk=int(value)) | Q(username=value)).values('pk')
+            return Q(**{f'{field}_id__in': users})
+        return Q(**{f'{field}__username': value})
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if data.get('status') == 'unassigned':
+            queryset = queryset.filter(status__isnull=True)
+        elif 'status' in data:
+            queryset = queryset.filter(status=int(data['status']))
+        if data.get('delivery_crew') == 'unassigned':
+            queryset = queryset.filter(delivery_crew__isnull=True)
+        elif 'delivery_crew' in data:
+            queryset = queryset.filter(self.user_filter('delivery_crew', data['delivery_crew']))
+        if 'customer' in data:
+            queryset = queryset.filter(self.user_filter('user', data['customer']))
+        if 'date_from' in data:
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if 'date_to' in data:
+            queryset = queryset.filter(date__lte=data['date_to'])
+        if 'total_min' in data:
+            queryset = queryset.filter(total__gte=data['total_min'])
+        if 'total_max' in data:
+            queryset = queryset.filter(total__lte=data['total_max'])
+        for term in data.get('search', '').replace(',', ' ').split():
+            if term in ('0', '1'):
+                queryset = queryset.filter(status=int(term))
+            else:
+                queryset = queryset.filter(delivery_crew__username=term)
+        return queryset
+
+
+class DispatchAssignmentSerializer(serializers.Serializer):
+    order = serializers.IntegerField(min_value=1)
+    delivery_crew = serializers.CharField(max_length=150)
+
+
+class OrderDispatchSerializer(serializers.Serializer):
+    max_batch_size = 500
+
+    mode = serializers.ChoiceField(choices=['manual', 'auto'], default='manual')
+    assignments = DispatchAssignmentSerializer(many=True, required=False, max_length=max_batch_size)
+    orders = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, max_length=max_batch_size
+    )
+    delivery_crew = serializers.ListField(
+        child=serializers.CharField(max_length=150), required=False, allow_empty=False
+    )
+
+    def validate(self, data):
+        if data['mode'] == 'manual' and not data.get('assignments'):
+            raise serializers.ValidationError({'assignments': 'This field is required in manual mode.'})
+        return data
+
+
+class OrderStatusSerializer(serializers.Serializer):
+    max_batch_size = 500
+
+    orders = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=max_batch_size
+    )
+    status = serializers.ChoiceField(choices=['0', '1', 'unassigned'])
+
+
+class MenuImportRowSerializer(serializers.Serializer):
+    """One row of a menu import; see catalog.py."""
+    id = serializers.IntegerField(min_value=1, required=False)
+    title = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=6, decimal_places=2)
+    featured = serializers.BooleanField(required=False)
+    category = serializers.SlugField(max_length=50)
+    category_title = serializers.CharField(max_length=255, required=False)
+
+
+class MenuImportSerializer(serializers.Serializer):
+    dry_run = serializers.BooleanField(default=False)
+
+
+class SalesReportSerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=['day', 'menuitem', 'category'], default='day')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'date_from' in data:
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if 'date_to' in data:
+            queryset = queryset.filter(date__lte=data['date_to'])
+        return queryset
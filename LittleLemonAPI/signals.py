@@ -0,0 +1,113 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from LittleLemonAPI.authentication import invalidate_tokens
+from LittleLemonAPI.models import Category, MenuItem, Order
+from LittleLemonAPI.cache import bump_menu_version
+from LittleLemonAPI.permissions import invalidate_roles
+from LittleLemonAPI import metrics, profiling, rollups, search
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_menu_cache(sender, **kwargs):
+    # Bump after commit so a concurrent reader cannot cache pre-commit rows
+    # under the new version.
+    transaction.on_commit(bump_menu_version)
+
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, **kwargs):
+    search.index_menu_items([(instance.pk, instance.title, instance.category.title)])
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, **kwargs):
+    search.remove_menu_items([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created, **kwargs):
+    if not created:
+        search.index_menu_items(instance.menuitem_set.values_list('pk', 'title', 'category__title'))
+
+
+@receiver(pre_delete, sender=Order)
+def reverse_order_sales(sender, instance, **kwargs):
+    # Covers orders deleted with their customer as well as on their own.
+    # Lines deleted with their menu item need nothing: that item's DailySales
+    # rows cascade with it.
+    rollups.record_order(instance, instance.orderitem_set.all(), sign=-1)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # post_clear carries no pk_set, so remember who was in the group.
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        instance.__dict__.pop('_role_cache', None)
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = instance.__dict__.pop('_cleared_user_ids', [])
+    else:
+        user_ids = pk_set
+    transaction.on_commit(lambda: invalidate_roles(user_ids))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_members(sender, instance, created=False, **kwargs):
+    # Renaming or deleting a group changes every member's roles without
+    # sending m2m_changed.
+    if created:
+        return
+    user_ids = list(instance.user_set.values_list('pk', flat=True))
+    transaction.on_commit(lambda: invalidate_roles(user_ids))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    # djoser's logout deletes the token; stop accepting it from the cache too.
+    # The key is the primary key, which delete() resets once signals are sent.
+    keys = [instance.key]
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Cached users would otherwise keep a stale is_active, password or name.
+    # Logging in only touches last_login, which nothing reads from the cache.
+    if created or update_fields == frozenset(['last_login']):
+        return
+    keys = list(Token.objects.filter(user=instance).values_list('key', flat=True))
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    metrics.install(connection)
+    profiling.install(connection)
+
+
+@receiver(connection_created)
+def use_wal(sender, connection, **kwargs):
+    # journal_mode=WAL persists in the file, so it is kept off the checked-in
+    # development database; see DATABASES in settings.py. Run on the raw
+    # connection so it is not counted as one of the request's queries.
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        return
+    if Path(connection.settings_dict['NAME']).resolve() != Path(settings.DEV_DATABASE).resolve():
+        connection.connection.execute('PRAGMA journal_mode=WAL')
@@ -0,0 +1,79 @@
+"""
+Order summaries: a copy, on each Order row, of everything the order's API
+representation shows besides the order's own columns.
+
+Checkout captures the customer and the lines, so item titles, categories
+and prices stay as they were when the order was placed, whatever happens
+to the menu later. The crew fields are rewritten only when the order is
+assigned or unassigned, through assign(). Orders from before summaries
+existed have ``lines`` None until backfill() reaches them, and are
+rendered from the live rows meanwhile.
+"""
+from django.db import transaction
+from rest_framework import serializers
+
+from LittleLemonAPI.models import Order
+
+SUMMARY_FIELDS = ['customer_username', 'customer_email', 'crew_username', 'crew_email', 'item_count', 'lines']
+CREW_FIELDS = ['delivery_crew', 'crew_username', 'crew_email']
+BATCH_SIZE = 1000
+
+money = serializers.DecimalField(max_digits=6, decimal_places=2)
+
+
+def line(item):
+    """An OrderItem, with its menu item and category loaded, as OrderSerializer renders it."""
+    menuitem = item.menuitem
+    return {
+        'menuitem': {
+            'title': menuitem.title,
+            'price': money.to_representation(menuitem.price),
+            'category': menuitem.category.title,
+        },
+        'quantity': item.quantity,
+        'unit_price': money.to_representation(item.unit_price),
+        'price': money.to_representation(item.price),
+    }
+
+
+def assign(order, crew):
+    """Set (or with None, clear) the order's crew and its crew summary."""
+    order.delivery_crew = crew
+    order.crew_username = crew.username if crew is not None else ''
+    order.crew_email = crew.email if crew is not None else ''
+
+
+def crew_values(crew):
+    """What assign() sets, as keyword arguments for QuerySet.update()."""
+    order = Order()
+    assign(order, crew)
+    return {field: getattr(order, field) for field in CREW_FIELDS}
+
+
+def summarize(order, items):
+    """Fill in every summary field of ``order`` from its user, crew and OrderItems."""
+    order.customer_username = order.user.username
+    order.customer_email = order.user.email
+    assign(order, order.delivery_crew)
+    order.lines = [line(item) for item in items]
+    order.item_count = sum(item.quantity for item in items)
+
+
+def backfill(batch_size=BATCH_SIZE, everything=False):
+    """
+    Summarize orders in batches of ``batch_size``, each in its own
+    transaction; by default only those not summarized yet. Yields the
+    number of orders done after each batch.
+    """
+    orders = Order.objects.all() if everything else Order.objects.filter(lines__isnull=True)
+    last_id, done = 0, 0
+    while True:
+        with transaction.atomic():
+            batch = list(orders.filter(pk__gt=last_id).order_by('pk').with_details()[:batch_size])
+            if not batch:
+                return
+            for order in batch:
+                summarize(order, order.orderitem_set.all())
+            Order.objects.bulk_update(batch, SUMMARY_FIELDS)
+        last_id, done = batch[-1].pk, done + len(batch)
+        yield done
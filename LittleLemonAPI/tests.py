@@ -1,3 +1,1402 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import pstats
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User, Group
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection, connections, transaction
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from LittleLemonAPI import carts, metrics, renderers, summaries, urls
+from LittleLemonAPI.models import CatalogVersion, Category, MenuItem, Cart, Order, OrderItem
+from LittleLemonAPI.authentication import local_users, token_cache_key
+from LittleLemonAPI.cache import bump_menu_version
+from LittleLemonAPI.bench import benchmark_database, seed_dataset
+from LittleLemonAPI.db import retry_on_locked
+from LittleLemonAPI.renderers import FastJSONRenderer
+from LittleLemonAPI.serializers import MenuItemSerializer, OrderSerializer
+from LittleLemonAPI.management.commands import benchmark
+from LittleLemonAPI.permissions import LOCAL_ROLE_CACHE_TIMEOUT, ROLE_CACHE_TIMEOUT, get_roles, in_group, \
+    role_cache_timeout
+from LittleLemonAPI.throttles import UserSlidingWindowThrottle
+
+
+# A cache every worker process would share, for the code paths that only
+# trust a shared cache (see cache.is_shared).
+shared_cache = override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': tempfile.mkdtemp(prefix='littlelemon-cache-'),
+}})
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        patcher = mock.patch.object(APIView, 'check_throttles', lambda self, request: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def make_user(self, username, group=None):
+        user = User.objects.create_user(username=username, password='pass1234')
+        if group:
+            Group.objects.get_or_create(name=group)[0].user_set.add(user)
+        return user
+
+
+@shared_cache
+class MenuCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(slug='main', title='Main')
+        self.item = MenuItem.objects.create(title='Pasta', price='12.50', category=self.category)
+
+    def test_repeat_get_is_served_from_cache(self):
+        first = self.client.get('/api/menu-items')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/menu-items')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(f'/api/menu-items/{self.item.pk}/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/menu-items/{self.item.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_category_resolves_by_slug_or_title(self):
+        Category.objects.create(title='Main Course')
+        MenuItem.objects.create(title='Steak', price='20.00', category=Category.objects.get(slug='main-course'))
+        by_slug = self.client.get('/api/menu-items/?category=main-course')
+        self.assertEqual([item['category_name'] for item in by_slug.data], ['Main Course'])
+        self.assertEqual(self.client.get('/api/menu-items/?category=Main Course').data, by_slug.data)
+
+    def test_full_menu_is_grouped_and_prebuilt(self):
+        response = self.client.get('/api/menu/')
+        self.assertEqual(json.loads(response.content), [{
+            'id': self.category.pk, 'slug': 'main', 'title': 'Main',
+            'items': [{'id': self.item.pk, 'title': 'Pasta', 'price': '12.50', 'featured': False}],
+        }])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/menu/').content, response.content)
+            self.assertEqual(self.client.get('/api/menu/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_catalog_change_invalidates(self):
+        etag = self.client.get('/api/menu-items/?category=main')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.price = '13.00'
+            self.item.save()
+        response = self.client.get('/api/menu-items/?category=main', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data[0]['price'], '13.00')
+
+
+class LocalMenuCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(slug='main', title='Main')
+        MenuItem.objects.create(title='Pasta', price='12.50', category=category)
+
+    def test_version_comes_from_the_database_without_a_shared_cache(self):
+        etag = self.client.get('/api/menu-items')['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/menu-items', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A change made through another worker process, whose cache this one
+        # never sees.
+        CatalogVersion.objects.update_or_create(pk=1, defaults={'version': 42})
+        response = self.client.get('/api/menu-items', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.update(price='13.00')
+            bump_menu_version()
+        self.assertEqual(self.client.get('/api/menu-items/?category=main').data[0]['price'], '13.00')
+
+
+class MenuCatalogTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.main = Category.objects.create(slug='main', title='Main')
+        self.pasta = MenuItem.objects.create(title='Pasta', price='12.50', category=self.main)
+        self.client.force_authenticate(self.make_user('manager', 'manager'))
+
+    def post(self, body, content_type='text/csv', query=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.generic('POST', f'/api/menu/import/{query}', body, content_type=content_type)
+
+    def test_csv_import_creates_updates_and_reports_bad_rows(self):
+        etag = self.client.get('/api/menu-items')['ETag']
+        response = self.post(
+            'id,title,price,featured,category,category_title\n'
+            f'{self.pasta.pk},Penne,13.00,true,main,Mains\n'
+            ',Soup,4.50,,sides,Sides\n'
+            ',Salad,free,,sides,\n'
+            ',Cake,6.00,,desserts,\n'
+            '999,Ghost,1.00,,main,\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], {'categories': 1, 'menu_items': 1})
+        self.assertEqual(response.data['updated'], {'categories': 1, 'menu_items': 1})
+        self.assertEqual([(error['line'], list(error['errors'])) for error in response.data['errors']],
+                         [(4, ['price']), (5, ['category_title']), (6, ['id'])])
+
+        self.pasta.refresh_from_db()
+        self.assertEqual((self.pasta.title, self.pasta.price, self.pasta.featured), ('Penne', Decimal('13.00'), True))
+        self.assertEqual(Category.objects.get(slug='main').title, 'Mains')
+        self.assertEqual(MenuItem.objects.get(title='Soup').category.slug, 'sides')
+        self.assertNotEqual(self.client.get('/api/menu-items')['ETag'], etag)
+        titles = [item['title'] for item in self.client.get('/api/menu-items/search/', {'q': 'soup'}).data]
+        self.assertEqual(titles, ['Soup'])
+
+    def test_blank_featured_keeps_the_current_value(self):
+        MenuItem.objects.filter(pk=self.pasta.pk).update(featured=True)
+        self.post(f'id,title,price,featured,category\n{self.pasta.pk},Pasta,12.50,,main\n,Soup,4.50,,main\n')
+        self.pasta.refresh_from_db()
+        self.assertTrue(self.pasta.featured)
+        self.assertFalse(MenuItem.objects.get(title='Soup').featured)
+
+    def test_dry_run_reports_without_writing(self):
+        body = '{"title": "Soup", "price": "4.50", "category": "sides", "category_title": "Sides"}\n' \
+               '{"title": "Stew", "price": "8.00", "category": "sides"}\n' \
+               'not json\n'
+        response = self.post(body, 'application/x-ndjson', '?dry_run=true')
+        self.assertEqual(response.data['created'], {'categories': 1, 'menu_items': 2})
+        self.assertEqual(response.data['errors'], [{'line': 3, 'errors': {'non_field_errors': ['Invalid JSON.']}}])
+        self.assertEqual(MenuItem.objects.count(), 1)
+        self.assertFalse(Category.objects.filter(slug='sides').exists())
+
+    def test_export_imports_back_unchanged(self):
+        MenuItem.objects.create(title='Soup, "hot"', price='4.50', featured=True, category=self.main)
+        for format in ('csv', 'ndjson'):
+            with self.subTest(format=format):
+                response = self.client.get(f'/api/menu/export/?format={format}')
+                exported = b''.join(response.streaming_content)
+                report = self.post(exported, response['Content-Type'].split(';')[0]).data
+                self.assertEqual(report['updated']['menu_items'], 2)
+                self.assertEqual((report['created'], report['errors']), ({'categories': 0, 'menu_items': 0}, []))
+                again = self.client.get(f'/api/menu/export/?format={format}')
+                self.assertEqual(b''.join(again.streaming_content), exported)
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        counts = []
+        for size in (3, 300):
+            rows = ''.join(f'Dish {size}-{n},{n}.00,main\n' for n in range(size))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post('title,price,category\n' + rows)
+            self.assertEqual(response.data['created']['menu_items'], size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unreadable_requests_are_rejected(self):
+        self.assertEqual(self.post('name,cost\nSoup,4\n').status_code, 400)
+        self.assertEqual(self.post('<menu/>', 'application/xml').status_code, 415)
+        self.client.force_authenticate(self.make_user('driver', 'delivery-crew'))
+        self.assertEqual(self.post('title,price,category\n').status_code, 403)
+        self.assertEqual(self.client.get('/api/menu/export/').status_code, 403)
+
+    def test_commands_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'menu.ndjson')
+            call_command('export_menu', format='ndjson', output=path)
+            with open(path) as exported:
+                self.assertEqual(json.loads(exported.readline())['title'], 'Pasta')
+
+            out = io.StringIO()
+            call_command('import_menu', path, dry_run=True, stdout=out)
+            self.assertIn('Would import 1 rows: 0 menu items and 0 categories created, 1 menu items', out.getvalue())
+
+
+class EndpointFixtureMixin:
+    """Users in each role, a small menu, a few multi-line orders and a cart."""
+
+    def setUp(self):
+        super().setUp()
+        self.users = {
+            'manager': self.make_user('manager', 'manager'),
+            'crew': self.make_user('crew', 'delivery-crew'),
+            'customer': self.make_user('customer'),
+        }
+        category = Category.objects.create(slug='main', title='Main')
+        items = [
+            MenuItem.objects.create(title=f'Pasta {i}', price='10.00', category=category)
+            for i in range(5)
+        ]
+        for _ in range(4):
+            order = Order.objects.create(
+                user=self.users['customer'], delivery_crew=self.users['crew'], status=0, total='30.00'
+            )
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, menuitem=item, quantity=1, unit_price='10.00', price='10.00')
+                for item in items[:3]
+            )
+        for item in items:
+            Cart.objects.create(user=self.users['customer'], menuitem=item, quantity=1, unit_price='10.00')
+        self.ids = {
+            'category': Category.objects.create(slug='spare', title='Spare').pk,
+            'menuitem': items[0].pk,
+            'order': order.pk,
+            'unassigned': Order.objects.create(user=self.users['customer'], total='10.00').pk,
+            'manager': self.users['manager'].pk,
+            'crew': self.users['crew'].pk,
+        }
+        list(summaries.backfill())
+
+    def format(self, value):
+        if isinstance(value, str):
+            return value.format(**self.ids)
+        if isinstance(value, dict):
+            return {key: self.format(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.format(item) for item in value]
+        return value
+
+    def request(self, method, path, role, body):
+        """Make one request with a cold role cache, roll it back and return the queries it ran."""
+        cache.clear()
+        for user in self.users.values():
+            user.__dict__.pop('_role_cache', None)
+        self.client.force_authenticate(self.users.get(role))
+        sid = transaction.savepoint()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(self.format(path), self.format(body), format='json')
+                content = b''.join(response) if response.streaming else response.content
+        finally:
+            transaction.savepoint_rollback(sid)
+        self.assertLess(response.status_code, 400, content)
+        return queries.captured_queries
+
+
+class QueryBudgetTests(EndpointFixtureMixin, APITestCase):
+    # (route in LittleLemonAPI/urls.py, method, path, role, body, max queries).
+    # Every route must appear here; authentication is forced and the role
+    # cache starts cold, so budgets cover the view plus one role lookup. Fixture orders have several lines each, so any
+    # per-row lazy load pushes a budget over its limit. The test cache is
+    # not shared, so menu reads include the catalog version lookup.
+    BUDGETS = [
+        ('categories/', 'get', '/api/categories/', 'manager', None, 3),
+        ('categories/', 'post', '/api/categories/', 'manager', {'slug': 'sides', 'title': 'Sides'}, 3),
+        ('categories/<int:pk>/', 'get', '/api/categories/{category}/', 'manager', None, 2),
+        ('categories/<int:pk>/', 'patch', '/api/categories/{category}/', 'manager', {'title': 'Mains'}, 4),
+        ('menu-items', 'get', '/api/menu-items', None, None, 3),
+        ('menu-items', 'post', '/api/menu-items', 'manager',
+         {'title': 'Soup', 'price': '4.50', 'category_id': '{category}'}, 5),
+        ('menu-items/', 'get', '/api/menu-items/?category=Main', None, None, 3),
+        ('menu-items/', 'get', '/api/menu-items/', None, None, 2),
+        ('menu-items/<int:pk>/', 'get', '/api/menu-items/{menuitem}/', None, None, 2),
+        ('menu-items/<int:pk>/', 'patch', '/api/menu-items/{menuitem}/', 'manager', {'price': '9.99'}, 5),
+        ('menu/', 'get', '/api/menu/', None, None, 3),
+        ('menu/import/', 'post', '/api/menu/import/', 'manager',
+         [{'title': 'Soup', 'price': '4.50', 'category': 'sides', 'category_title': 'Sides'},
+          {'id': '{menuitem}', 'title': 'Penne', 'price': '9.50', 'category': 'main'}], 10),
+        ('menu/export/', 'get', '/api/menu/export/?format=csv', 'manager', None, 2),
+        ('menu-items/search/', 'get', '/api/menu-items/search/?q=psta', None, None, 5),
+        ('groups/manager/users/', 'get', '/api/groups/manager/users/', 'manager', None, 3),
+        ('groups/manager/users/', 'post', '/api/groups/manager/users/', 'manager', {'username': 'customer'}, 8),
+        ('groups/manager/users/<int:userId>/', 'delete', '/api/groups/manager/users/{manager}/', 'manager', None, 5),
+        ('groups/delivery-crew/users/', 'get', '/api/groups/delivery-crew/users/', 'manager', None, 3),
+        ('groups/delivery-crew/users/', 'post', '/api/groups/delivery-crew/users/', 'manager',
+         {'username': 'customer'}, 8),
+        ('groups/delivery-crew/users/<int:userId>/', 'delete', '/api/groups/delivery-crew/users/{crew}/',
+         'manager', None, 5),
+        ('cart/menu-items/', 'get', '/api/cart/menu-items/', 'customer', None, 1),
+        ('cart/menu-items/', 'post', '/api/cart/menu-items/', 'customer',
+         {'menuitem_name': 'Pasta 0', 'quantity': 2}, 5),
+        ('cart/menu-items/', 'post', '/api/cart/menu-items/', 'customer',
+         [{'menuitem_name': f'pasta {i}', 'quantity': 2} for i in range(5)] + [{'menuitem_id': '{menuitem}', 'quantity': 1}],
+         5),
+        ('cart/menu-items/', 'delete', '/api/cart/menu-items/', 'customer', None, 1),
+        ('orders/', 'get', '/api/orders/', 'manager', None, 2),
+        ('orders/', 'get', '/api/orders/', 'crew', None, 2),
+        ('orders/', 'get', '/api/orders/', 'customer', None, 2),
+        ('orders/', 'post', '/api/orders/', 'customer', None, 7),
+        ('orders/export/', 'get', '/api/orders/export/?status=0', 'manager', None, 2),
+        ('orders/export/', 'get', '/api/orders/export/?format=csv', 'manager', None, 2),
+        ('orders/dispatch/', 'post', '/api/orders/dispatch/', 'manager',
+         {'assignments': [{'order': '{order}', 'delivery_crew': 'crew'},
+                          {'order': '{unassigned}', 'delivery_crew': 'crew'}]}, 6),
+        ('orders/dispatch/', 'post', '/api/orders/dispatch/', 'manager', {'mode': 'auto'}, 6),
+        ('orders/status/', 'post', '/api/orders/status/', 'crew',
+         {'orders': ['{order}', '{unassigned}'], 'status': 1}, 2),
+        ('orders/status/', 'post', '/api/orders/status/', 'manager',
+         {'orders': ['{order}'], 'status': 'unassigned'}, 2),
+        ('orders/<int:pk>/', 'get', '/api/orders/{order}/', 'customer', None, 2),
+        ('orders/<int:pk>/', 'patch', '/api/orders/{order}/', 'manager', {'delivery_crew': 'crew', 'status': 0}, 5),
+        ('orders/<int:pk>/', 'patch', '/api/orders/{order}/', 'crew', {'status': 1}, 3),
+        ('orders/<int:pk>/', 'delete', '/api/orders/{order}/', 'manager', None, 8),
+        ('analytics/sales/', 'get', '/api/analytics/sales/?group_by=category', 'manager', None, 2),
+        ('metrics/', 'get', '/api/metrics/', 'manager', None, 1),
+    ]
+
+    def test_every_route_has_a_budget(self):
+        routes = {str(pattern.pattern) for pattern in urls.urlpatterns}
+        self.assertEqual(routes, {budget[0] for budget in self.BUDGETS})
+
+    def test_endpoints_stay_within_query_budget(self):
+        for route, method, path, role, body, budget in self.BUDGETS:
+            with self.subTest(method=method, route=route, role=role):
+                queries = self.request(method, path, role, body)
+                self.assertLessEqual(len(queries), budget, '\n'.join(query['sql'] for query in queries))
+
+
+class QueryPlanTests(EndpointFixtureMixin, APITestCase):
+    # Requests whose queries on the growing tables must be answered from an
+    # index. Listing every order or every rollup (an unfiltered export or
+    # sales report) reads the whole table by design and is left out.
+    TABLES = ['LittleLemonAPI_order', 'LittleLemonAPI_orderitem', 'LittleLemonAPI_cart', 'LittleLemonAPI_dailysales']
+    REQUESTS = [
+        ('get', '/api/cart/menu-items/', 'customer', None),
+        ('post', '/api/cart/menu-items/', 'customer', {'menuitem_id': '{menuitem}', 'quantity': 2}),
+        ('delete', '/api/cart/menu-items/', 'customer', None),
+        ('get', '/api/orders/', 'manager', None),
+        ('get', '/api/orders/?ordering=total', 'manager', None),
+        ('get', '/api/orders/?ordering=-date&paginate=false', 'manager', None),
+        ('get', '/api/orders/', 'crew', None),
+        ('get', '/api/orders/?ordering=-date', 'crew', None),
+        ('get', '/api/orders/', 'customer', None),
+        ('get', '/api/orders/?customer=customer&date_from=2024-01-01&date_to=2099-12-31', 'manager', None),
+        ('get', '/api/orders/?delivery_crew={crew}&status=0', 'manager', None),
+        ('get', '/api/orders/?delivery_crew=unassigned', 'manager', None),
+        ('get', '/api/orders/?search=crew 0', 'manager', None),
+        ('get', '/api/orders/?total_min=20&total_max=40&ordering=total', 'manager', None),
+        ('post', '/api/orders/', 'customer', None),
+        ('get', '/api/orders/export/?status=0&date_from=2024-01-01', 'manager', None),
+        ('get', '/api/orders/export/?date_from=2024-01-01&format=csv', 'manager', None),
+        ('post', '/api/orders/dispatch/', 'manager', {'mode': 'auto'}),
+        ('post', '/api/orders/dispatch/', 'manager', {'assignments': [{'order': '{order}', 'delivery_crew': 'crew'}]}),
+        ('post', '/api/orders/status/', 'crew', {'orders': ['{order}'], 'status': 1}),
+        ('get', '/api/orders/{order}/', 'customer', None),
+        ('patch', '/api/orders/{order}/', 'crew', {'status': 1}),
+        ('delete', '/api/orders/{order}/', 'manager', None),
+        ('get', '/api/analytics/sales/?date_from=2024-01-01', 'manager', None),
+    ]
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        # "SCAN t USING INDEX i" walks an index in order; a bare "SCAN t"
+        # reads every row.
+        return [step for step in plan if step in {f'SCAN {table}' for table in self.TABLES}]
+
+    def test_queries_on_large_tables_use_an_index(self):
+        for method, path, role, body in self.REQUESTS:
+            with self.subTest(method=method, path=path, role=role):
+                for query in self.request(method, path, role, body):
+                    if query['sql'].startswith(('SELECT', 'UPDATE', 'DELETE')):
+                        self.assertEqual(self.full_scans(query['sql']), [], query['sql'])
+
+
+class RoleCacheTests(APITestCase):
+    def test_roles_are_resolved_once_and_invalidated_on_membership_change(self):
+        user = self.make_user('driver', 'delivery-crew')
+        self.assertEqual(get_roles(user), {'delivery-crew'})
+        fresh = User.objects.get(pk=user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(in_group(fresh, 'delivery-crew'))
+            self.assertFalse(in_group(fresh, 'manager'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.create(name='manager').user_set.add(user)
+        self.assertEqual(get_roles(User.objects.get(pk=user.pk)), {'delivery-crew', 'manager'})
+
+    def test_roles_expire_quickly_without_a_shared_cache(self):
+        # Invalidation cannot reach other workers' memory caches, so a revoked
+        # role must not outlive a few seconds there.
+        user = self.make_user('boss', 'manager')
+        get_roles(user)
+        fresh = User.objects.get(pk=user.pk)
+        later = time.time() + LOCAL_ROLE_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later), \
+                self.assertNumQueries(1):
+            get_roles(fresh)
+
+        with shared_cache:
+            self.assertEqual(role_cache_timeout(), ROLE_CACHE_TIMEOUT)
+
+
+@shared_cache
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('manager', 'manager')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_warm_request_reaches_the_view_without_queries(self):
+        self.client.get('/api/menu-items/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/menu-items/')
+        self.assertEqual(response.status_code, 200)
+
+        # The shared cache alone is enough when this process has not seen the token.
+        local_users.clear()
+        with self.assertNumQueries(0):
+            self.client.get('/api/menu-items/')
+
+    def test_per_process_cache_is_not_trusted_with_tokens(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.client.get('/api/categories/')
+            self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+            # A revocation elsewhere is noticed once this process's LRU entry goes.
+            Token.objects.filter(pk=self.token.pk).update(key='revoked')
+            local_users.clear()
+            self.assertEqual(self.client.get('/api/categories/').status_code, 401)
+
+    def test_role_change_applies_to_cached_user(self):
+        self.client.get('/api/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.clear()
+        self.assertEqual(self.client.get('/api/categories/').status_code, 403)
+
+    def test_logout_and_deactivation_revoke_cached_tokens(self):
+        self.client.get('/api/menu-items/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/auth/token/logout/').status_code, 204)
+        self.assertEqual(self.client.get('/api/menu-items/').status_code, 401)
+
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get('/api/menu-items/')
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/api/menu-items/').status_code, 401)
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(slug='main', title='Main')
+        self.item = MenuItem.objects.create(title='Pasta', price='12.50', category=category)
+        self.customer = self.make_user('customer')
+        self.other = self.make_user('other')
+        self.driver = self.make_user('driver', 'delivery-crew')
+        self.order = Order.objects.create(user=self.customer, delivery_crew=self.driver, total='12.50')
+        OrderItem.objects.create(order=self.order, menuitem=self.item, quantity=1, unit_price='12.50', price='12.50')
+        Order.objects.create(user=self.other, total='1.00')
+        list(summaries.backfill())
+        self.tokens = {user: Token.objects.create(user=user).key for user in (self.customer, self.other, self.driver)}
+
+    def headers(self, user):
+        return {'Authorization': f'Token {self.tokens[user]}'}
+
+    async def compare(self, user, path, status_code=200):
+        sync_response = await sync_to_async(self.client.get)(f'/api/{path}', headers=self.headers(user))
+        response = await self.async_client.get(f'/api/async/{path}', headers=self.headers(user))
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(response.status_code, sync_response.status_code)
+        self.assertEqual(response.json(), sync_response.json())
+        return response.json()
+
+    async def test_menu_reads_match_sync_views(self):
+        await self.compare(self.customer, 'menu-items')
+        await self.compare(self.customer, f'menu-items/{self.item.pk}/')
+        await self.compare(self.customer, 'menu-items/?category=main')
+        await self.compare(self.customer, 'menu-items/999/', 404)
+
+    async def test_orders_keep_role_scoping(self):
+        page = await self.compare(self.customer, 'orders/')
+        self.assertEqual([order['id'] for order in page['results']], [self.order.pk])
+        await self.compare(self.driver, f'orders/{self.order.pk}/')
+        await self.compare(self.other, f'orders/{self.order.pk}/', 403)
+
+        response = await self.async_client.get('/api/async/orders/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.post('/api/async/orders/', headers=self.headers(self.customer))
+        self.assertEqual(response.status_code, 405)
+
+
+class PerformanceMiddlewareTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.clear()
+        self.addCleanup(metrics.clear)
+        self.manager = self.make_user('manager', 'manager')
+        self.customer = self.make_user('customer')
+        for _ in range(2):
+            Order.objects.create(user=self.customer, total='10.00')
+
+    def timings(self, response):
+        return {
+            name: dict(part.split('=', 1) for part in params)
+            for name, *params in (entry.strip().split(';') for entry in response['Server-Timing'].split(','))
+        }
+
+    def test_server_timing_counts_the_request_queries(self):
+        self.client.force_authenticate(self.customer)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/')
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'total', 'db', 'app', 'render'})
+        self.assertEqual(timings['db']['desc'], f'"{len(queries)} queries"')
+        total = float(timings['total']['dur'])
+        self.assertGreaterEqual(total, float(timings['db']['dur']) + float(timings['app']['dur']) - 0.01)
+
+    def test_metrics_are_labelled_by_view_and_managers_only(self):
+        self.client.force_authenticate(self.customer)
+        self.client.get('/api/orders/')
+        self.client.get('/api/orders/')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        self.assertIn(
+            'littlelemon_request_duration_seconds_count{view="OrderView",method="GET",phase="db"} 2\n', text
+        )
+        self.assertIn('littlelemon_responses_total{view="MetricsView",method="GET",status="403"} 1\n', text)
+        self.assertIn('littlelemon_request_queries_bucket{view="OrderView",method="GET",le="+Inf"} 2\n', text)
+
+    async def test_async_views_are_timed_too(self):
+        response = await self.async_client.get('/api/async/menu-items')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('view="MenuItemList (async)"', metrics.render())
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.client.force_authenticate(self.make_user('customer'))
+
+    def profiling(self, **options):
+        return override_settings(PROFILING=dict({'ENABLED': True, 'DIRECTORY': self.directory}, **options))
+
+    def profiles(self, view):
+        return sorted(os.listdir(os.path.join(self.directory, view))) \
+            if os.path.isdir(os.path.join(self.directory, view)) else []
+
+    def test_disabled_by_default(self):
+        with override_settings(PROFILING={'DIRECTORY': self.directory, 'SAMPLE_RATE': 1, 'SLOW_QUERY_MS': 0}):
+            self.client.get('/api/orders/')
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_sampled_requests_are_profiled_per_view_and_rotated(self):
+        with self.profiling(SAMPLE_RATE=1, MAX_FILES_PER_VIEW=2, SLOW_QUERY_MS=10 ** 6):
+            for _ in range(3):
+                self.client.get('/api/orders/')
+        files = self.profiles('OrderView')
+        self.assertEqual(len(files), 2)
+        stats = pstats.Stats(os.path.join(self.directory, 'OrderView', files[0]))
+        self.assertTrue(any(name == 'list' for _, _, name in stats.stats))
+
+    def test_slow_request_threshold(self):
+        with self.profiling(SAMPLE_RATE=0, SLOW_REQUEST_MS=10 ** 6, SLOW_QUERY_MS=10 ** 6):
+            self.client.get('/api/orders/')
+        self.assertEqual(self.profiles('OrderView'), [])
+        with self.profiling(SAMPLE_RATE=0, SLOW_REQUEST_MS=0, SLOW_QUERY_MS=10 ** 6):
+            self.client.get('/api/orders/')
+        self.assertEqual(len(self.profiles('OrderView')), 1)
+
+    def test_slow_queries_are_logged_with_their_plan_and_reported(self):
+        with self.profiling(SAMPLE_RATE=1, SLOW_QUERY_MS=0), self.assertLogs('LittleLemonAPI.profiling', 'WARNING'):
+            self.client.get('/api/orders/')
+        with open(os.path.join(self.directory, 'slow-queries.jsonl')) as log:
+            entries = [json.loads(line) for line in log]
+        orders = [entry for entry in entries if 'FROM "LittleLemonAPI_order"' in entry['sql']]
+        self.assertEqual(orders[0]['view'], 'OrderView')
+        self.assertTrue(any('order_user_date_idx' in step for step in orders[0]['plan']), orders[0]['plan'])
+
+        output = io.StringIO()
+        call_command('profile_report', directory=self.directory, view=['OrderView'], stdout=output)
+        report = output.getvalue()
+        self.assertIn('OrderView: 1 profiles', report)
+        self.assertIn('FROM "LittleLemonAPI_order"', report)
+        self.assertIn('plan: SEARCH LittleLemonAPI_order USING INDEX order_user_date_idx', report)
+
+
+class FastReadPathTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(title='Café \u2028 "Specials"')
+        items = [
+            MenuItem.objects.create(title=title, price=price, category=category, featured=featured)
+            for title, price, featured in [
+                ('Crème brûlée 🍮', '7.00', True), ('Line\u2029sep', '12.50', False),
+                ('Tab\there', '0.05', False), ('Soup', '4.10', False),
+            ]
+        ]
+        customer = self.make_user('customer')
+        crew = self.make_user('crew', 'delivery-crew')
+        self.manager = self.make_user('manager', 'manager')
+        for n, (status_value, assigned) in enumerate([(None, None), (0, crew), (1, crew), (None, crew)]):
+            order = Order.objects.create(user=customer, delivery_crew=assigned, status=status_value, total='19.50')
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, menuitem=item, quantity=n + 1, unit_price=item.price, price=item.price)
+                for item in items[:n + 1]
+            )
+        Order.objects.create(user=customer, total='0.00')
+        list(summaries.backfill())
+        self.client.force_authenticate(self.manager)
+
+    def fetch(self, path, **headers):
+        cache.clear()
+        response = self.client.get(path, **headers)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response) if response.streaming else response.content
+
+    def test_output_is_byte_for_byte_unchanged(self):
+        paths = [
+            '/api/menu-items', '/api/menu-items?ordering=-price',
+            '/api/orders/', '/api/orders/?page_size=2', '/api/orders/?paginate=false&ordering=total',
+            '/api/orders/export/',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                expected = self.fetch(path)
+                with override_settings(FAST_JSON_RENDERING=True), \
+                        mock.patch.object(MenuItemSerializer, 'to_representation', side_effect=AssertionError), \
+                        mock.patch.object(OrderSerializer, 'to_representation', side_effect=AssertionError):
+                    self.assertEqual(self.fetch(path), expected)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            'when': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 5, 1), 'at': datetime.time(9, 15), 1: 'int key',
+            'text': 'line\u2028para\u2029 "quoted" \x00', 'price': Decimal('12.50'), 'none': None,
+        }
+        with override_settings(FAST_JSON_RENDERING=True):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+            self.assertEqual(
+                FastJSONRenderer().render(data, 'application/json; indent=2'),
+                JSONRenderer().render(data, 'application/json; indent=2')
+            )
+
+    def test_cursors_from_values_rows_walk_the_same_pages(self):
+        expected, url = [], '/api/orders/?page_size=2'
+        while url:
+            expected.append(self.fetch(url))
+            url = json.loads(expected[-1])['next']
+
+        pages, url = [], '/api/orders/?page_size=2'
+        with override_settings(FAST_JSON_RENDERING=True):
+            while url:
+                pages.append(self.fetch(url))
+                url = json.loads(pages[-1])['next']
+        self.assertEqual(pages, expected)
+        self.assertEqual(len(pages), 3)
+
+    def test_check_warns_when_orjson_is_missing(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.check_orjson(None), [])
+            with override_settings(FAST_JSON_RENDERING=True):
+                self.assertEqual([warning.id for warning in renderers.check_orjson(None)], ['LittleLemonAPI.W001'])
+
+
+class OrderPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', 'manager')
+        customer = self.make_user('customer')
+        # Every order shares today's date and several share a total, so ties
+        # must be broken by id.
+        Order.objects.bulk_create(Order(user=customer, total=f'{10 + i % 3}.00') for i in range(11))
+        self.client.force_authenticate(self.manager)
+
+    def walk(self, url):
+        seen, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            seen += [order['id'] for order in response.data['results']]
+            url = response.data['next']
+        return seen, pages
+
+    def test_pages_follow_date_then_id(self):
+        seen, pages = self.walk('/api/orders/?page_size=4')
+        expected = list(Order.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[2]['previous']).data
+        self.assertEqual(previous['results'], pages[1]['results'])
+
+    def test_pages_follow_requested_ordering(self):
+        seen, _ = self.walk('/api/orders/?page_size=3&ordering=total')
+        expected = list(Order.objects.order_by('total', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_opt_out_returns_full_list(self):
+        response = self.client.get('/api/orders/?paginate=false')
+        self.assertEqual(len(response.data), 11)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/orders/?cursor=bogus').status_code, 404)
+
+
+class OrderFilterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user('manager', 'manager'))
+        alice, bob = self.make_user('alice'), self.make_user('bob')
+        self.driver = self.make_user('driver', 'delivery-crew')
+        self.orders = {
+            'delivered': Order.objects.create(user=alice, delivery_crew=self.driver, status=1, total='12.00'),
+            'out': Order.objects.create(user=bob, delivery_crew=self.driver, status=0, total='30.00'),
+            'unassigned': Order.objects.create(user=bob, total='55.50'),
+        }
+        Order.objects.filter(pk=self.orders['delivered'].pk).update(date=datetime.date(2024, 3, 1))
+
+    def ids(self, query):
+        response = self.client.get(f'/api/orders/?paginate=false&{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return {name for name, order in self.orders.items() if order.pk in {row['id'] for row in response.data}}
+
+    def test_filters(self):
+        cases = [
+            ('status=1', {'delivered'}),
+            ('status=unassigned', {'unassigned'}),
+            (f'delivery_crew={self.driver.pk}', {'delivered', 'out'}),
+            ('delivery_crew=driver&status=0', {'out'}),
+            ('delivery_crew=unassigned', {'unassigned'}),
+            ('customer=bob', {'out', 'unassigned'}),
+            ('date_to=2024-12-31', {'delivered'}),
+            ('date_from=2025-01-01&customer=alice', set()),
+            ('total_min=30&total_max=55.50', {'out', 'unassigned'}),
+            ('search=driver 0', {'out'}),
+            ('search=1', {'delivered'}),
+        ]
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(self.ids(query), expected)
+
+    def test_numeric_usernames_match_as_well_as_ids(self):
+        numeric = self.make_user('987654321')
+        self.orders['numeric'] = Order.objects.create(user=numeric, total='9.00')
+        self.assertEqual(self.ids('customer=987654321'), {'numeric'})
+        self.assertEqual(self.ids(f'customer={numeric.pk}'), {'numeric'})
+
+    def test_invalid_values_never_reach_the_database(self):
+        self.client.get('/api/orders/')  # Loads the manager's roles.
+        for query in ['status=2', 'date_from=yesterday', 'total_min=cheap', 'date_from=2025-02-01&date_to=2025-01-01',
+                      'total_min=10&total_max=5']:
+            with self.subTest(query=query), self.assertNumQueries(0):
+                self.assertEqual(self.client.get(f'/api/orders/?{query}').status_code, 400)
+
+    def test_export_takes_the_same_filters(self):
+        response = self.client.get('/api/orders/export/?customer=bob&total_max=40')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.orders['out'].pk])
+
+
+class OrderDispatchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user('manager', 'manager'))
+        self.customer = self.make_user('customer')
+        self.busy = self.make_user('busy', 'delivery-crew')
+        self.idle = self.make_user('idle', 'delivery-crew')
+        # busy has two open orders; its delivered one does not count.
+        for status in (0, None, 1):
+            Order.objects.create(user=self.customer, delivery_crew=self.busy, status=status, total='10.00')
+        self.unassigned = [Order.objects.create(user=self.customer, total='10.00') for _ in range(4)]
+
+    def test_auto_mode_fills_the_least_loaded_crew_first(self):
+        response = self.client.post('/api/orders/dispatch/', {'mode': 'auto'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['assigned'], 4)
+        # idle takes orders until it matches busy's two, then they alternate.
+        self.assertEqual(
+            [row['delivery_crew'] for row in response.data['assignments']], ['idle', 'idle', 'busy', 'idle']
+        )
+        self.assertEqual(Order.objects.filter(delivery_crew=self.idle, status=0).count(), 3)
+        self.assertFalse(Order.objects.filter(delivery_crew__isnull=True).exists())
+
+    def test_auto_mode_skips_delivered_unassigned_orders(self):
+        delivered = Order.objects.create(user=self.customer, status=1, total='10.00')
+        response = self.client.post(
+            '/api/orders/dispatch/', {'mode': 'auto', 'orders': [delivered.pk, self.unassigned[0].pk]}, format='json'
+        )
+        self.assertEqual([row['order'] for row in response.data['assignments']], [self.unassigned[0].pk])
+        delivered.refresh_from_db()
+        self.assertEqual((delivered.delivery_crew, delivered.status), (None, 1))
+
+    def test_auto_mode_can_be_limited_to_orders_and_crew(self):
+        wanted = [order.pk for order in self.unassigned[:2]]
+        response = self.client.post(
+            '/api/orders/dispatch/', {'mode': 'auto', 'orders': wanted, 'delivery_crew': ['busy']}, format='json'
+        )
+        self.assertEqual(response.data['assigned'], 2)
+        self.assertEqual(Order.objects.filter(pk__in=wanted, delivery_crew=self.busy, status=0).count(), 2)
+        self.assertEqual(Order.objects.filter(delivery_crew__isnull=True).count(), 2)
+
+    def test_manual_mode_assigns_in_one_update(self):
+        assignments = [
+            {'order': self.unassigned[0].pk, 'delivery_crew': 'busy'},
+            {'order': self.unassigned[1].pk, 'delivery_crew': 'idle'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/orders/dispatch/', {'assignments': assignments}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries.captured_queries), 1)
+        self.unassigned[1].refresh_from_db()
+        self.assertEqual((self.unassigned[1].delivery_crew, self.unassigned[1].status), (self.idle, 0))
+
+    def test_manual_mode_rejects_the_whole_batch_on_any_bad_row(self):
+        delivered = Order.objects.get(status=1)
+        valid = {'order': self.unassigned[0].pk, 'delivery_crew': 'idle'}
+        cases = [
+            ([dict(valid, delivery_crew='customer')], 400),
+            ([valid, {'order': 999999, 'delivery_crew': 'idle'}], 404),
+            ([valid, {'order': delivered.pk, 'delivery_crew': 'idle'}], 400),
+            ([], 400),
+        ]
+        for assignments, code in cases:
+            with self.subTest(assignments=assignments):
+                response = self.client.post('/api/orders/dispatch/', {'assignments': assignments}, format='json')
+                self.assertEqual(response.status_code, code, response.content)
+        self.assertEqual(Order.objects.filter(delivery_crew__isnull=True).count(), 4)
+
+    def test_managers_only(self):
+        self.client.force_authenticate(self.busy)
+        response = self.client.post('/api/orders/dispatch/', {'mode': 'auto'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderStatusTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        customer = self.make_user('customer')
+        self.manager = self.make_user('manager', 'manager')
+        self.driver = self.make_user('driver', 'delivery-crew')
+        other = self.make_user('other', 'delivery-crew')
+        self.mine = [
+            Order.objects.create(user=customer, delivery_crew=self.driver, status=0, total='10.00') for _ in range(3)
+        ]
+        self.theirs = Order.objects.create(user=customer, delivery_crew=other, status=0, total='10.00')
+        list(summaries.backfill())
+
+    def post(self, user, orders, status):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            '/api/orders/status/', {'orders': [order.pk for order in orders], 'status': status}, format='json'
+        )
+
+    def test_crew_changes_only_their_own_orders_in_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(self.driver, self.mine + [self.theirs], 1)
+        self.assertEqual(response.data, {'status': '1', 'requested': 4, 'updated': 3})
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries.captured_queries), 1)
+        self.assertEqual(Order.objects.filter(status=1).count(), 3)
+        self.theirs.refresh_from_db()
+        self.assertEqual(self.theirs.status, 0)
+
+    def test_only_managers_unassign(self):
+        response = self.post(self.driver, self.mine, 'unassigned')
+        self.assertEqual(response.status_code, 403)
+
+        response = self.post(self.manager, self.mine[:2] + [self.theirs], 'unassigned')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Order.objects.filter(delivery_crew__isnull=True, status__isnull=True).count(), 3)
+        self.assertEqual(
+            set(Order.objects.filter(delivery_crew__isnull=True).values_list('crew_username', 'crew_email')), {('', '')}
+        )
+
+    def test_customers_and_bad_input_are_rejected(self):
+        self.assertEqual(self.post(self.make_user('someone'), self.mine, 1).status_code, 403)
+        self.assertEqual(self.post(self.driver, self.mine, 2).status_code, 400)
+        self.assertEqual(self.post(self.driver, [], 1).status_code, 400)
+        self.assertFalse(Order.objects.exclude(status=0).exists())
+
+
+class OrderExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        customer = self.make_user('customer')
+        category = Category.objects.create(slug='main', title='Main')
+        item = MenuItem.objects.create(title='Pasta', price='10.00', category=category)
+        self.orders = [Order.objects.create(user=customer, total='20.00', status=status) for status in (0, 1, None)]
+        for order in self.orders:
+            OrderItem.objects.create(order=order, menuitem=item, quantity=2, unit_price='10.00', price='20.00')
+        self.client.force_authenticate(self.make_user('manager', 'manager'))
+
+    def test_ndjson_streams_one_order_per_line(self):
+        response = self.client.get('/api/orders/export/?status=unassigned')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 1)
+        order = json.loads(lines[0])
+        self.assertEqual(order['id'], self.orders[2].pk)
+        self.assertEqual(order['items'][0]['menuitem']['title'], 'Pasta')
+
+    def test_csv_has_one_row_per_line_item(self):
+        response = self.client.get('/api/orders/export/', HTTP_ACCEPT='text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['order_id'] for row in rows], [str(order.pk) for order in self.orders])
+        self.assertEqual(rows[0]['price'], '20.00')
+
+    def test_invalid_filters_and_non_managers_are_rejected(self):
+        self.assertEqual(self.client.get('/api/orders/export/?date_from=yesterday').status_code, 400)
+        self.client.force_authenticate(self.make_user('driver', 'delivery-crew'))
+        self.assertEqual(self.client.get('/api/orders/export/').status_code, 403)
+
+
+class OrderSummaryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(slug='main', title='Main')
+        self.pasta = MenuItem.objects.create(title='Pasta', price='10.00', category=category)
+        self.customer = User.objects.create_user(username='customer', email='c@example.com', password='pass1234')
+        self.manager = self.make_user('manager', 'manager')
+        self.driver = User.objects.create_user(username='driver', email='d@example.com', password='pass1234')
+        Group.objects.get_or_create(name='delivery-crew')[0].user_set.add(self.driver)
+        Cart.objects.create(user=self.customer, menuitem=self.pasta, quantity=3, unit_price='10.00')
+        self.client.force_authenticate(self.customer)
+        self.order = Order.objects.get(pk=self.client.post('/api/orders/').json()['id'])
+
+    def test_checkout_snapshots_customer_and_lines(self):
+        self.assertEqual((self.order.customer_username, self.order.customer_email), ('customer', 'c@example.com'))
+        self.assertEqual(self.order.item_count, 3)
+        self.assertEqual(self.order.lines, [{
+            'menuitem': {'title': 'Pasta', 'price': '10.00', 'category': 'Main'},
+            'quantity': 3, 'unit_price': '10.00', 'price': '30.00',
+        }])
+
+    def test_titles_stay_as_ordered_after_menu_edits(self):
+        self.client.force_authenticate(self.manager)
+        self.client.patch(f'/api/menu-items/{self.pasta.pk}/', {'title': 'Penne', 'price': '12.00'}, format='json')
+        order = self.client.get(f'/api/orders/{self.order.pk}/').json()
+        self.assertEqual(order['items'][0]['menuitem'], {'title': 'Pasta', 'price': '10.00', 'category': 'Main'})
+        self.assertEqual(self.client.get('/api/orders/').json()['results'][0]['items'], order['items'])
+
+    def test_crew_is_refreshed_on_reassignment_only(self):
+        self.client.force_authenticate(self.manager)
+        response = self.client.patch(f'/api/orders/{self.order.pk}/', {'delivery_crew': 'driver'}, format='json')
+        self.assertEqual(response.json()['delivery_crew'], {'username': 'driver', 'email': 'd@example.com'})
+
+        User.objects.filter(pk=self.driver.pk).update(email='new@example.com')
+        crew = self.client.get(f'/api/orders/{self.order.pk}/').json()['delivery_crew']
+        self.assertEqual(crew['email'], 'd@example.com')
+
+        self.client.post('/api/orders/status/', {'orders': [self.order.pk], 'status': 'unassigned'}, format='json')
+        self.client.post('/api/orders/dispatch/', {'mode': 'auto'}, format='json')
+        crew = self.client.get(f'/api/orders/{self.order.pk}/').json()['delivery_crew']
+        self.assertEqual(crew, {'username': 'driver', 'email': 'new@example.com'})
+
+    def test_list_reads_only_the_order_table(self):
+        get_roles(self.manager)
+        self.client.force_authenticate(self.manager)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/')
+        self.assertEqual(response.json()['results'][0]['items'][0]['quantity'], 3)
+        self.assertNotIn('item_count', response.json()['results'][0])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+
+    def test_unsummarized_orders_render_the_same_until_backfilled(self):
+        self.client.force_authenticate(self.manager)
+        expected = self.client.get('/api/orders/').content
+        Order.objects.update(customer_username='', customer_email='', item_count=0, lines=None)
+        self.assertEqual(self.client.get('/api/orders/').content, expected)
+        self.assertEqual(self.client.get(f'/api/orders/{self.order.pk}/').json()['items'][0]['quantity'], 3)
+
+        out = io.StringIO()
+        call_command('backfill_order_summaries', batch_size=1, stdout=out)
+        self.assertIn('Summarized 1 orders.', out.getvalue())
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.customer_username, self.order.item_count), ('customer', 3))
+        self.assertEqual(self.client.get('/api/orders/').content, expected)
+
+    async def test_async_list_renders_unsummarized_orders(self):
+        token = await Token.objects.acreate(user=self.manager)
+        await Order.objects.aupdate(customer_username='', customer_email='', item_count=0, lines=None)
+        response = await self.async_client.get('/api/async/orders/', headers={'authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['customer']['username'], 'customer')
+        self.assertEqual(response.json()['results'][0]['items'][0]['quantity'], 3)
+
+
+class CartBulkTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(slug='main', title='Main')
+        self.pasta = MenuItem.objects.create(title='Pasta', price='10.00', category=category)
+        self.soup = MenuItem.objects.create(title='Soup', price='4.50', category=category)
+        self.customer = self.make_user('customer')
+        Cart.objects.create(user=self.customer, menuitem=self.soup, quantity=5, unit_price='4.50')
+        self.client.force_authenticate(self.customer)
+
+    def test_list_upserts_every_item(self):
+        response = self.client.post('/api/cart/menu-items/', [
+            {'menuitem_name': 'PASTA', 'quantity': 2},
+            {'menuitem_id': self.soup.pk, 'quantity': 1},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['menuitem']['title'] for row in response.data], ['Pasta', 'Soup'])
+        self.assertEqual(
+            dict(Cart.objects.filter(user=self.customer).values_list('menuitem__title', 'quantity')),
+            {'Pasta': 2, 'Soup': 1}
+        )
+
+    def test_invalid_items_are_reported_per_item_and_nothing_is_saved(self):
+        response = self.client.post('/api/cart/menu-items/', [
+            {'menuitem_name': 'Pasta', 'quantity': 2},
+            {'menuitem_name': 'Pizza', 'quantity': 1},
+            {'menuitem_id': 999, 'quantity': 0},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(0, response.data)
+        self.assertIn('menuitem_name', response.data[1])
+        self.assertEqual(set(response.data[2]), {'menuitem_id', 'quantity'})
+        self.assertFalse(Cart.objects.filter(menuitem=self.pasta).exists())
+
+
+CACHE_CART_STORE = {'BACKEND': 'LittleLemonAPI.carts.CacheCartStore'}
+
+
+@shared_cache
+@override_settings(CART_STORE=CACHE_CART_STORE)
+class CartStoreTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(slug='main', title='Main')
+        self.pasta = MenuItem.objects.create(title='Pasta', price='10.00', category=category)
+        self.soup = MenuItem.objects.create(title='Soup', price='4.50', category=category)
+        self.customer = self.make_user('customer')
+        self.soup_line = Cart.objects.create(user=self.customer, menuitem=self.soup, quantity=5, unit_price='4.50')
+        self.client.force_authenticate(self.customer)
+
+    def table(self):
+        return dict(Cart.objects.filter(user=self.customer).values_list('menuitem__title', 'quantity'))
+
+    def cart(self):
+        return {row['menuitem']['title']: row['quantity'] for row in self.client.get('/api/cart/menu-items/').data}
+
+    def post(self, menuitem, quantity):
+        # The cached cart is updated once the request's transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                '/api/cart/menu-items/', {'menuitem_id': menuitem.pk, 'quantity': quantity}, format='json'
+            )
+
+    def test_rolled_back_adds_leave_the_cached_cart_alone(self):
+        self.assertEqual(self.cart(), {'Soup': 5})
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(OperationalError):
+            with transaction.atomic():
+                carts.get_store().add(self.customer, [(self.pasta, 2), (self.soup, 1)])
+                raise OperationalError('database is locked')
+        self.assertEqual(self.cart(), {'Soup': 5})
+        self.assertEqual(self.table(), {'Soup': 5})
+
+    def test_new_lines_keep_their_row_id(self):
+        line = self.post(self.pasta, 2).data
+        row = Cart.objects.get(user=self.customer, menuitem=self.pasta)
+        self.assertEqual(line['id'], row.pk)
+        self.assertEqual(
+            {item['menuitem']['title']: item['id'] for item in self.client.get('/api/cart/menu-items/').data},
+            {'Soup': self.soup_line.pk, 'Pasta': row.pk}
+        )
+
+    def test_changes_reach_the_table_at_checkout(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.post(self.soup, 2)
+        self.assertFalse([query for query in queries if 'INSERT' in query['sql'] or 'UPDATE' in query['sql']])
+        self.post(self.pasta, 1)
+        self.assertEqual(self.cart(), {'Soup': 2, 'Pasta': 1})
+        self.assertEqual(self.table(), {'Soup': 5, 'Pasta': 1})
+
+        order = self.client.post('/api/orders/').data
+        ordered = {item['menuitem']['title']: item['quantity'] for item in order['items']}
+        self.assertEqual(ordered, {'Soup': 2, 'Pasta': 1})
+        self.assertEqual(self.cart(), {})
+        self.assertEqual(self.table(), {})
+
+    def test_cleared_cart_is_written_back_empty(self):
+        response = self.client.delete('/api/cart/menu-items/')
+        self.assertEqual(response.data, {'message': 'Deleted 1 cart item(s).'})
+        self.assertEqual(self.cart(), {})
+        self.assertEqual(self.client.post('/api/orders/').status_code, 400)
+        self.assertEqual(self.table(), {})
+
+    def test_flush_carts_writes_back_idle_carts(self):
+        self.post(self.soup, 2)
+        out = io.StringIO()
+        call_command('flush_carts', stdout=out)
+        self.assertIn('Wrote back 0 carts.', out.getvalue())
+        self.assertEqual(self.table(), {'Soup': 5})
+
+        with override_settings(CART_STORE=dict(CACHE_CART_STORE, OPTIONS={'timeout': 0})):
+            call_command('flush_carts', stdout=out)
+        self.assertIn('Wrote back 1 carts.', out.getvalue())
+        self.assertEqual(self.table(), {'Soup': 2})
+        self.assertEqual(self.cart(), {'Soup': 2})
+
+    def test_refuses_caches_that_can_lose_carts(self):
+        for backend in ['locmem.LocMemCache', 'dummy.DummyCache']:
+            with self.subTest(backend=backend), \
+                    override_settings(CACHES={'default': {'BACKEND': f'django.core.cache.backends.{backend}'}}):
+                with self.assertRaises(ImproperlyConfigured):
+                    carts.get_store()
+
+    @override_settings(CART_STORE={'BACKEND': 'LittleLemonAPI.carts.DatabaseCartStore'})
+    def test_database_store_writes_every_change(self):
+        self.post(self.pasta, 2)
+        self.assertEqual(self.table(), {'Soup': 5, 'Pasta': 2})
+        self.client.delete('/api/cart/menu-items/')
+        self.assertEqual(self.table(), {})
+
+
+class MenuSearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        mains = Category.objects.create(slug='mains', title='Mains')
+        desserts = Category.objects.create(slug='desserts', title='Desserts')
+        self.carbonara = MenuItem.objects.create(title='Spaghetti Carbonara', price='12.00', category=mains)
+        self.bolognese = MenuItem.objects.create(title='Spaghetti Bolognese', price='11.00', category=mains)
+        self.tiramisu = MenuItem.objects.create(title='Tiramisu', price='6.00', category=desserts)
+
+    def search(self, query):
+        cache.clear()
+        response = self.client.get('/api/menu-items/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data]
+
+    def test_prefix_and_typo_matching(self):
+        self.assertEqual(self.search('spag carb'), ['Spaghetti Carbonara'])
+        self.assertEqual(self.search('tiramsu'), ['Tiramisu'])
+        self.assertEqual(self.search('dessert'), ['Tiramisu'])
+        self.assertEqual(self.search('pizza'), [])
+
+    def test_title_matches_rank_above_category_matches(self):
+        MenuItem.objects.create(title='Mains Platter', price='20.00', category=self.tiramisu.category)
+        self.assertEqual(self.search('mains')[0], 'Mains Platter')
+
+    def test_index_follows_catalog_changes(self):
+        self.bolognese.title = 'Lasagne'
+        self.bolognese.save()
+        self.carbonara.delete()
+        self.tiramisu.category.title = 'Sweets'
+        self.tiramisu.category.save()
+        self.assertEqual(self.search('spaghetti'), [])
+        self.assertEqual(self.search('lasagne'), ['Lasagne'])
+        self.assertEqual(self.search('sweets'), ['Tiramisu'])
+
+
+class SalesRollupTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        mains = Category.objects.create(slug='mains', title='Mains')
+        self.pasta = MenuItem.objects.create(title='Pasta', price='10.00', category=mains)
+        self.soup = MenuItem.objects.create(title='Soup', price='4.50', category=mains)
+        self.customer = self.make_user('customer')
+        self.manager = self.make_user('manager', 'manager')
+
+    def checkout(self, *lines):
+        for item, quantity in lines:
+            Cart.objects.create(user=self.customer, menuitem=item, quantity=quantity, unit_price=item.price)
+        self.client.force_authenticate(self.customer)
+        return self.client.post('/api/orders/').data['id']
+
+    def report(self, group_by):
+        self.client.force_authenticate(self.manager)
+        return self.client.get('/api/analytics/sales/', {'group_by': group_by}).data
+
+    def test_checkout_and_delete_keep_rollups_current(self):
+        self.checkout((self.pasta, 2), (self.soup, 1))
+        order_id = self.checkout((self.pasta, 1))
+        self.assertEqual(
+            [(row['title'], row['quantity'], row['revenue'], row['orders']) for row in self.report('menuitem')],
+            [('Pasta', 3, '30.00', 2), ('Soup', 1, '4.50', 1)]
+        )
+
+        self.client.force_authenticate(self.manager)
+        self.client.delete(f'/api/orders/{order_id}/')
+        self.assertEqual(self.report('day')[0]['revenue'], '24.50')
+
+    def test_deleting_a_customer_removes_their_sales(self):
+        self.checkout((self.pasta, 2), (self.soup, 1))
+        other = self.make_user('other')
+        Cart.objects.create(user=other, menuitem=self.soup, quantity=2, unit_price=self.soup.price)
+        self.client.force_authenticate(other)
+        self.client.post('/api/orders/')
+
+        self.customer.delete()
+        self.assertEqual(
+            [(row['title'], row['quantity'], row['revenue'], row['orders']) for row in self.report('menuitem')],
+            [('Pasta', 0, '0.00', 0), ('Soup', 2, '9.00', 1)]
+        )
+        call_command('rebuild_sales_rollups', stdout=io.StringIO())
+        self.assertEqual(self.report('day')[0]['revenue'], '9.00')
+
+    def test_deleting_a_menu_item_drops_its_sales(self):
+        self.checkout((self.pasta, 2), (self.soup, 1))
+        self.pasta.delete()
+        self.assertEqual([row['title'] for row in self.report('menuitem')], ['Soup'])
+        self.assertEqual(self.report('day')[0]['revenue'], '4.50')
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.checkout((self.pasta, 2), (self.soup, 1))
+        self.checkout((self.soup, 3))
+        incremental = self.report('category')
+        call_command('rebuild_sales_rollups', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(self.report('category'), incremental)
+        self.assertEqual(incremental[0]['revenue'], '38.00')
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.sqlite_store = {
+            'BACKEND': 'LittleLemonAPI.throttles.SQLiteCounterStore',
+            'OPTIONS': {'path': os.path.join(directory.name, 'throttle.sqlite3')},
+        }
+        self.cache_store = {'BACKEND': 'LittleLemonAPI.throttles.CacheCounterStore'}
+        self.user = User.objects.create_user('customer')
+        cache.clear()
+
+    def hits(self, times):
+        # 5/minute; returns the allow/deny decision for a request at each time.
+        results = []
+        for now in times:
+            throttle = UserSlidingWindowThrottle()
+            throttle.timer = lambda: now
+            results.append(throttle.allow_request(mock.Mock(user=self.user), None))
+        return results, throttle
+
+    def test_previous_window_is_weighted_by_overlap(self):
+        for store in (self.sqlite_store, self.cache_store):
+            with self.subTest(store=store['BACKEND']), override_settings(THROTTLE_STORE=store):
+                cache.clear()
+                results, _ = self.hits([600] * 5 + [660, 690])
+                # At 660 all five earlier hits still count; halfway through
+                # the next window only two and a half of them do.
+                self.assertEqual(results, [True] * 5 + [False, True])
+
+    def test_wait_is_time_until_estimate_drops_below_rate(self):
+        with override_settings(THROTTLE_STORE=self.sqlite_store):
+            results, throttle = self.hits([600] * 6)
+        self.assertFalse(results[-1])
+        # Five counted hits need 60s to roll over and another 12s to decay
+        # to four, leaving room for one more.
+        self.assertAlmostEqual(throttle.wait(), 72)
+
+    def test_rejected_requests_are_not_counted(self):
+        # Ten requests a minute against a limit of five: every minute still
+        # lets four or five through instead of locking the client out.
+        times = range(600, 900, 6)
+        for store in (self.sqlite_store, self.cache_store):
+            with self.subTest(store=store['BACKEND']), override_settings(THROTTLE_STORE=store):
+                cache.clear()
+                results, _ = self.hits(times)
+                per_minute = [
+                    sum(ok for now, ok in zip(times, results) if now // 60 == minute) for minute in range(10, 15)
+                ]
+                self.assertEqual(per_minute, [5, 4, 4, 4, 4])
+
+    def test_api_returns_429_once_the_rate_is_spent(self):
+        with override_settings(THROTTLE_STORE=self.cache_store):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            statuses = [client.get('/api/cart/menu-items/').status_code for _ in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+
+
+class JournalModeTests(SimpleTestCase):
+    # Opens connections of its own to files outside the test database.
+    databases = {'default'}
+
+    def test_wal_is_set_on_every_file_but_the_checked_in_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name, mode in [(os.path.join(directory, 'live.sqlite3'), 'wal'), (settings.DEV_DATABASE, 'delete')]:
+                with self.subTest(name=name):
+                    other = connections['default'].__class__(dict(connection.settings_dict, NAME=name))
+                    try:
+                        with other.cursor() as cursor:
+                            cursor.execute('PRAGMA journal_mode')
+                            self.assertEqual(cursor.fetchone()[0], mode)
+                    finally:
+                        other.close()
+
+
+@mock.patch('LittleLemonAPI.db.time.sleep')
+class RetryOnLockedTests(SimpleTestCase):
+    def flaky(self, failures, message='database is locked'):
+        calls = []
+
+        @retry_on_locked
+        def write():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return 'done'
+        return write, calls
+
+    def test_retries_locked_writes_with_bounded_backoff(self, sleep):
+        write, calls = self.flaky(2)
+        self.assertEqual(write(), 'done')
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(all(0 <= call.args[0] <= 1 for call in sleep.call_args_list))
+
+        write, calls = self.flaky(10)
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 6)
+
+    def test_other_errors_and_nested_transactions_are_not_retried(self, sleep):
+        write, calls = self.flaky(1, 'no such table: cart')
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+        write, calls = self.flaky(1)
+        with mock.patch.object(connection, 'in_atomic_block', True), self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+
+class BenchmarkDatasetTests(APITestCase):
+    def test_seed_is_deterministic_and_covers_every_route(self):
+        counts = seed_dataset(scale=0.002, seed=7)
+        self.assertEqual(Order.objects.count(), counts['orders'])
+        self.assertEqual(OrderItem.objects.count(), counts['order_items'])
+        self.assertEqual(get_roles(User.objects.get(username='bench-manager')), {'manager'})
+        self.assertEqual(get_roles(User.objects.get(username='bench-crew')), {'delivery-crew'})
+        first = list(Order.objects.order_by('pk').values_list('user__username', 'total', 'date')[:50])
+
+        Order.objects.all().delete()
+        User.objects.all().delete()
+        MenuItem.objects.all().delete()
+        Category.objects.all().delete()
+        seed_dataset(scale=0.002, seed=7)
+        self.assertEqual(list(Order.objects.order_by('pk').values_list('user__username', 'total', 'date')[:50]), first)
+
+        routes = {str(pattern.pattern) for pattern in urls.urlpatterns}
+        self.assertLessEqual(routes, {route[0] for route in benchmark.ROUTES})
+
+    def test_benchmark_database_restores_the_test_name(self):
+        test_name = connection.settings_dict['TEST'].get('NAME')
+        creation = connection.creation
+        with mock.patch.object(creation, 'create_test_db'), mock.patch.object(creation, 'destroy_test_db'):
+            with benchmark_database():
+                pass
+        self.assertEqual(connection.settings_dict['TEST'].get('NAME'), test_name)
@@ -1,4 +1,173 @@
-from rest_framework.throttling import UserRateThrottle
+import random
+import sqlite3
+import threading
 
-class TenCallsPerMinute(UserRateThrottle):
-    scope = 'ten'
\ No newline at end of file
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+
+class CacheCounterStore:
+    """
+    Window counters in a Django cache. Share them between workers by
+    pointing ``alias`` at a cache every worker can reach (Redis, Memcached),
+    whose incr() is atomic.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def hit(self, key, window, duration, weight, limit):
+        current_key = f'throttle:{key}:{window}'
+        counts = self.cache.get_many([current_key, f'throttle:{key}:{window - 1}'])
+        current = counts.get(current_key, 0)
+        previous = counts.get(f'throttle:{key}:{window - 1}', 0)
+        if previous * weight + current + 1 > limit:
+            return False, current, previous
+
+        self.cache.add(current_key, 0, duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr().
+            self.cache.set(current_key, 1, duration * 2)
+            current = 1
+        if previous * weight + current <= limit:
+            return True, current - 1, previous
+        # A concurrent request took the last slot since the read above.
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+        return False, current - 1, previous
+
+
+class SQLiteCounterStore:
+    """
+    Window counters in a local SQLite file that every worker on the host
+    shares. Each key is a single row updated by one atomic UPSERT, so memory
+    and storage per key stay constant whatever the request rate.
+    """
+    purge_probability = 0.001
+
+    def __init__(self, path, timeout=5):
+        self.path = str(path)
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS throttle '
+                '(key TEXT PRIMARY KEY, window INTEGER NOT NULL, count INTEGER NOT NULL, previous INTEGER NOT NULL)'
+            )
+            self.local.connection = conn
+        return conn
+
+    def hit(self, key, window, duration, weight, limit):
+        conn = self.connection()
+        # SET and WHERE expressions see the row as it was before this
+        # statement, so the old count rolls into `previous` when the window
+        # advances by one. A request over the limit updates nothing and
+        # returns no row.
+        rolled_previous = 'CASE excluded.window - window WHEN 0 THEN previous WHEN 1 THEN count ELSE 0 END'
+        rolled_count = 'CASE WHEN excluded.window = window THEN count ELSE 0 END'
+        row = conn.execute(
+            'INSERT INTO throttle (key, window, count, previous) '
+            'SELECT ?, ?, 1, 0 WHERE ? >= 1 '
+            'ON CONFLICT (key) DO UPDATE SET '
+            f'previous = {rolled_previous}, count = {rolled_count} + 1, window = excluded.window '
+            f'WHERE {rolled_previous} * ? + {rolled_count} + 1 <= ? '
+            'RETURNING count - 1, previous',
+            (key, window, limit, weight, limit)
+        ).fetchone()
+        if random.random() < self.purge_probability:
+            conn.execute('DELETE FROM throttle WHERE window < ?', (window - 1,))
+        if row is not None:
+            return (True, *row)
+
+        row = conn.execute('SELECT window, count, previous FROM throttle WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return False, 0, 0
+        last, count, previous = row
+        if last == window:
+            return False, count, previous
+        return False, 0, count if last == window - 1 else 0
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        config = settings.THROTTLE_STORE
+        _store = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting == 'THROTTLE_STORE':
+        _store = None
+
+
+class SlidingWindowThrottleMixin:
+    """
+    Replaces SimpleRateThrottle's per-key list of request timestamps with a
+    sliding-window counter: the count for the current fixed window plus the
+    previous window's count weighted by how much of it still overlaps the
+    sliding window. Two integers per key, in a store all workers share.
+
+    Stores implement ``hit(key, window, duration, weight, limit)``: count the
+    request only if ``previous * weight + current + 1 <= limit``, and return
+    ``(allowed, current, previous)`` with the counts as they were before it.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        # Only requests that are let through are counted, so a client that
+        # keeps calling too fast still gets its share once the window slides.
+        window, self.elapsed = divmod(self.timer(), self.duration)
+        allowed, self.current, self.previous = get_store().hit(
+            self.key, int(window), self.duration, 1 - self.elapsed / self.duration, self.num_requests
+        )
+        return allowed
+
+    def wait(self):
+        # current and previous exclude the rejected request, which needs
+        # room for one more.
+        room = self.num_requests - 1
+        if self.current > room:
+            # Full within this window alone: wait for it to become the
+            # previous window and decay enough.
+            return self.duration - self.elapsed + self.duration * (1 - room / self.current)
+        if not self.previous:
+            return None
+        return max(0, self.duration * (1 - (room - self.current) / self.previous) - self.elapsed)
+
+
+class AnonSlidingWindowThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottleMixin, UserRateThrottle):
+    pass
+
+
+class TenCallsPerMinute(SlidingWindowThrottleMixin, UserRateThrottle):
+    scope = 'ten'
@@ -11,6 +11,10 @@ urlpatterns = [
     path('menu-items', views.MenuItemList.as_view()),
     path('menu-items/', views.MenuItemsByCategoryView.as_view()),
     path('menu-items/<int:pk>/', views.MenuItemDetailView.as_view()),
+    path('menu-items/search/', views.MenuItemSearchView.as_view()),
+    path('menu/', views.FullMenuView.as_view()),
+    path('menu/import/', views.MenuImportView.as_view()),
+    path('menu/export/', views.MenuExportView.as_view()),
 
     # Manager group management endpoints
     path('groups/manager/users/', views.ManagerGroupUserListCreateView.as_view()),
@@ -25,5 +29,14 @@ urlpatterns = [
 
     # Order managemenet endpoints
     path('orders/', views.OrderView.as_view()),
+    path('orders/export/', views.OrderExportView.as_view()),
+    path('orders/dispatch/', views.OrderDispatchView.as_view()),
+    path('orders/status/', views.OrderStatusView.as_view()),
     path('orders/<int:pk>/', views.OrderDetailView.as_view()),
+
+    # Analytics endpoints
+    path('analytics/sales/', views.SalesReportView.as_view()),
+
+    # Monitoring endpoints
+    path('metrics/', views.MetricsView.as_view()),
 ]
\ No newline at end of file
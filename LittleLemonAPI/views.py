@@ -1,19 +1,56 @@
-from rest_framework import generics, status, filters
+from rest_framework import generics, status, filters, serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from rest_framework.permissions import IsAuthenticated
 from LittleLemonAPI.models import MenuItem
 from LittleLemonAPI.serializers import MenuItemSerializer, CategorySerializer, UserSerializer, \
         AddUserToManagerGroupSerializer, AddUserToDeliveryGroupSerializer, CartSerializer, \
-        MenuItemCategorySerializer, OrderSerializer
-from LittleLemonAPI.models import Category, Cart, Order, OrderItem
-from LittleLemonAPI.permissions import IsManagerOrReadOnly, IsManager, in_group
+        MenuItemCategorySerializer, OrderSerializer, OrderListSerializer, SalesReportSerializer, \
+        MenuItemValuesSerializer, OrderValuesSerializer, OrderDispatchSerializer, \
+        OrderStatusSerializer, MenuImportSerializer, UNASSIGNED
+from LittleLemonAPI.models import Category, Cart, Order, OrderItem, DailySales
+from LittleLemonAPI.permissions import IsManagerOrReadOnly, IsManager, in_group, get_roles, \
+        MANAGER, DELIVERY_CREW
+from LittleLemonAPI.cache import MenuCacheMixin, get_full_menu, etag_matches
+from LittleLemonAPI.filters import OrderFilterBackend
+from LittleLemonAPI.pagination import OrderPagination
+from LittleLemonAPI.renderers import NDJSONRenderer, CSVRenderer, PrometheusRenderer, fast_json_enabled
+from LittleLemonAPI.throttles import AnonSlidingWindowThrottle, UserSlidingWindowThrottle
+from LittleLemonAPI import carts, catalog, metrics, search, rollups, summaries
+from LittleLemonAPI.db import retry_on_locked
 from django.contrib.auth.models import User, Group
 from django.db import transaction
+from django.db.models import Count, F, Q, Sum, prefetch_related_objects
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.text import slugify
+from itertools import islice
+import heapq
 from rest_framework.decorators import throttle_classes
 
 
+class ValuesListMixin:
+    """
+    With FAST_JSON_RENDERING on (or whenever use_values() says so), list()
+    reads .values() rows and renders them with values_serializer_class
+    instead of building model instances. The response body is unchanged.
+    """
+    values_serializer_class = None
+
+    def use_values(self):
+        return fast_json_enabled()
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values():
+            return super().list(request, *args, **kwargs)
+
+        serializer_class = self.values_serializer_class
+        queryset = serializer_class.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page, many=True).data)
+        return Response(serializer_class(queryset, many=True).data)
+
+
 class MenuCategoriesView(generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -24,34 +61,35 @@ class MenuCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CategorySerializer
     permission_classes = [IsManager]
 
-class MenuItemList(generics.ListCreateAPIView):
-    queryset = MenuItem.objects.all()
+class MenuItemList(MenuCacheMixin, ValuesListMixin, generics.ListCreateAPIView):
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
+    values_serializer_class = MenuItemValuesSerializer
     ordering_fields = ['title', 'price', 'featured']
     search_fields = ['title']
 
-    @throttle_classes([AnonRateThrottle, UserRateThrottle])
+    @throttle_classes([AnonSlidingWindowThrottle, UserSlidingWindowThrottle])
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs) 
 
     def post(self, request, *args, **kwargs):
-        if not in_group(request.user, 'manager'):
+        if not in_group(request.user, MANAGER):
             return Response(
                 {"detail": "Only managers can add menu items."},
                 status=status.HTTP_403_FORBIDDEN
             )
         return super().post(request, *args, **kwargs)
 
-class MenuItemDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = MenuItem.objects.all()
+class MenuItemDetailView(MenuCacheMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
 
-    @throttle_classes([AnonRateThrottle, UserRateThrottle])
+    @throttle_classes([AnonSlidingWindowThrottle, UserSlidingWindowThrottle])
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs) 
     
     def put(self, request, *args, **kwargs):
-        if not in_group(request.user, 'manager'):
+        if not in_group(request.user, MANAGER):
             return Response(
                 {"detail": "Only managers can update menu items."},
                 status=status.HTTP_403_FORBIDDEN
@@ -65,7 +103,7 @@ class MenuItemDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def patch(self, request, *args, **kwargs):
-        if not in_group(request.user, 'manager'):
+        if not in_group(request.user, MANAGER):
             return Response(
                 {"detail": "Only managers can modify menu items."},
                 status=status.HTTP_403_FORBIDDEN
@@ -79,39 +117,136 @@ class MenuItemDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def delete(self, request, *args, **kwargs):
-        if not in_group(request.user, 'manager'):
+        if not in_group(request.user, MANAGER):
             return Response(
                 {"detail": "Only managers can delete menu items."},
                 status=status.HTTP_403_FORBIDDEN
             )
         return super().delete(request, *args, **kwargs)
     
-class MenuItemsByCategoryView(generics.ListAPIView):
+class MenuItemsByCategoryView(MenuCacheMixin, generics.ListAPIView):
     serializer_class = MenuItemCategorySerializer
 
+    def get_category(self, name):
+        # Slugs are unique and indexed; the title lookup only catches
+        # categories whose slug was not derived from their title.
+        category = Category.objects.filter(slug=slugify(name)).first()
+        if category is None:
+            category = Category.objects.filter(title__iexact=name).first()
+        return category
+
     def get_queryset(self):
-        queryset = MenuItem.objects.all()
+        return MenuItem.objects.select_related('category')
+    
+    @throttle_classes([AnonSlidingWindowThrottle, UserSlidingWindowThrottle])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
+    def list(self, request, *args, **kwargs):
         category_name = self.request.query_params.get('category', None)
 
         if category_name:
-            queryset = queryset.filter(category__title__iexact=category_name)
-        
-        return queryset
-    
-    @throttle_classes([AnonRateThrottle, UserRateThrottle])
+            category = self.get_category(category_name)
+            items = list(MenuItem.objects.filter(category=category)) if category else []
+            if not items:
+                return Response(
+                    {'detail': f"No menu items found for category: '{category_name}' or category does not exist."}, 
+                    status=status.HTTP_200_OK
+                )
+            for item in items:
+                item.category = category
+        else:
+            items = self.get_queryset()
+
+        serializer = self.get_serializer(items, many=True)
+        return Response(serializer.data)
+
+class MenuItemSearchView(MenuCacheMixin, generics.ListAPIView):
+    serializer_class = MenuItemSerializer
+    pagination_class = None
+    default_limit = 20
+    max_limit = 100
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(self.request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+
+        queryset = MenuItem.objects.select_related('category')
+        if not query:
+            return queryset.none()
+        if not search.is_supported():
+            return queryset.filter(title__icontains=query).order_by('title')[:limit]
+
+        ids = search.search_menu_item_ids(query, limit)
+        items = queryset.in_bulk(ids)
+        return [items[pk] for pk in ids if pk in items]
+
+    @throttle_classes([AnonSlidingWindowThrottle, UserSlidingWindowThrottle])
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        return super().get(request, *args, **kwargs)
 
-        category_name = self.request.query_params.get('category', None)
-        if category_name and not queryset.exists():
+class FullMenuView(APIView):
+    def get(self, request, *args, **kwargs):
+        payload, etag = get_full_menu()
+        if etag_matches(request, etag):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return HttpResponse(payload, content_type='application/json', headers={'ETag': etag})
+
+class MenuImportView(APIView):
+    """
+    Imports menu items and categories from a CSV (``text/csv``) or NDJSON
+    (``application/x-ndjson``) body, read as a stream; a JSON list of rows
+    also works for small imports. See catalog.py for the columns. Invalid
+    rows are skipped and reported by line; ``?dry_run=true`` only reports.
+    """
+    permission_classes = [IsManager]
+    stream_formats = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson'}
+
+    def post(self, request, *args, **kwargs):
+        params = MenuImportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        media_type = request.content_type.split(';')[0].strip().lower()
+        if media_type in self.stream_formats:
+            stream = request.stream
+            lines = catalog.read_lines(stream) if stream is not None else []
+            rows = catalog.PARSERS[self.stream_formats[media_type]](lines)
+        elif media_type == 'application/json':
+            if not isinstance(request.data, list):
+                return Response({'error': 'Expected a list of rows.'}, status=status.HTTP_400_BAD_REQUEST)
+            rows = catalog.parse_list(request.data)
+        else:
             return Response(
-                {'detail': f"No menu items found for category: '{category_name}' or category does not exist."}, 
-                status=status.HTTP_200_OK
+                {'error': 'Send text/csv, application/x-ndjson or application/json.'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
             )
-        
-        return Response(serializer.data)
+
+        try:
+            report = catalog.MenuImport(dry_run=params.validated_data['dry_run']).run(rows)
+        except catalog.CatalogFormatError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+
+class MenuExportView(APIView):
+    """The whole menu as NDJSON or CSV rows that MenuImportView accepts."""
+    permission_classes = [IsManager]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format == 'csv':
+            content = renderer.render_rows(catalog.export_rows(), catalog.FIELDS)
+        else:
+            content = (renderer.render_row(row) for row in catalog.export_rows())
+
+        response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="menu.{renderer.format}"'
+        return response
+
 
 class ManagerGroupUserListCreateView(generics.GenericAPIView):
     serializer_class = AddUserToManagerGroupSerializer
@@ -120,7 +255,7 @@ class ManagerGroupUserListCreateView(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         try:
-            group = Group.objects.get(name='manager')
+            group = Group.objects.get(name=MANAGER)
         except Group.DoesNotExist:
             return Response({'detail': 'Manager group does not exist.'}, status=status.HTTP_404_NOT_FOUND)
         
@@ -134,7 +269,7 @@ class ManagerGroupUserListCreateView(generics.GenericAPIView):
         user = serializer.validated_data['username']
 
         with transaction.atomic():
-            group, _ = Group.objects.get_or_create(name='manager')
+            group, _ = Group.objects.get_or_create(name=MANAGER)
 
             if group.user_set.filter(pk=user.pk).exists():
                 return Response({'detail': f'User {user.username} is already in the Manager group'},
@@ -152,7 +287,7 @@ class ManagerGroupUserDeleteView(APIView):
     def delete(self, request, userId, *args, **kwargs):
         try:
             user = User.objects.get(pk=userId)
-            group = Group.objects.get(name='manager')
+            group = Group.objects.get(name=MANAGER)
         except User.DoesNotExist:
             return Response({'detail': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
         except Group.DoesNotExist:
@@ -171,7 +306,7 @@ class DeliveryGroupUserListCreateView(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         try:
-            group = Group.objects.get(name='delivery-crew')
+            group = Group.objects.get(name=DELIVERY_CREW)
         except Group.DoesNotExist:
             return Response({'detail': 'Delivery group does not exist.'}, status=status.HTTP_404_NOT_FOUND)
         
@@ -185,7 +320,7 @@ class DeliveryGroupUserListCreateView(generics.GenericAPIView):
         user = serializer.validated_data['username']
 
         with transaction.atomic():
-            group, _ = Group.objects.get_or_create(name='delivery-crew')
+            group, _ = Group.objects.get_or_create(name=DELIVERY_CREW)
             if group.user_set.filter(pk=user.pk).exists():
                 return Response({'detail': f'User {user.username} is already in the Delivery group.'},
                                 status=status.HTTP_409_CONFLICT)
@@ -200,7 +335,7 @@ class DeliveryGroupUserDeleteView(APIView):
     def delete(self, request, userId, *args, **kwargs):
         try:
             user = User.objects.get(pk=userId)
-            group = Group.objects.get(name='delivery-crew')
+            group = Group.objects.get(name=DELIVERY_CREW)
         except User.DoesNotExist:
             return Response({'detail': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
         except Group.DoesNotExist:
@@ -220,51 +355,64 @@ class CartMenuItemsView(generics.ListCreateAPIView):
     queryset = Cart.objects.all()
 
     def get(self, request):
-        cart_items = Cart.objects.filter(user=request.user)
+        cart_items = carts.get_store().items(request.user)
         serializer = self.get_serializer(cart_items, many=True)
         return Response(serializer.data)
     
+    @retry_on_locked
     def post(self, request):
-        serializer = self.get_serializer(data=request.data, context={'request': request})
+        # A list body upserts many items at once; errors come back per item.
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many, context={'request': request})
 
         with transaction.atomic():
             if serializer.is_valid():
                 cart_item = serializer.save()
-                return Response(CartSerializer(cart_item).data, status=status.HTTP_201_CREATED)
+                return Response(CartSerializer(cart_item, many=many).data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @retry_on_locked
     def delete(self, request):
-        deleted_count, _ = Cart.objects.filter(user=request.user).delete()
+        deleted_count = carts.get_store().clear(request.user)
         return Response({'message': f'Deleted {deleted_count} cart item(s).'}, status=status.HTTP_204_NO_CONTENT)
 
-class OrderView(generics.ListCreateAPIView):
+class OrderView(ValuesListMixin, generics.ListCreateAPIView):
     serializer_class = OrderSerializer
+    values_serializer_class = OrderValuesSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['delivery_crew__username', 'status']
+    filter_backends = [OrderFilterBackend, filters.OrderingFilter]
     ordering_fields = ['date', 'total']
-    pagination_class = None 
+    pagination_class = OrderPagination
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="manager").exists():
-            return Order.objects.all()
-        elif user.groups.filter(name="delivery-crew").exists():
-            return Order.objects.filter(delivery_crew=user)
+        roles = get_roles(user)
+        queryset = Order.objects.all()
+        if MANAGER in roles:
+            return queryset
+        elif DELIVERY_CREW in roles:
+            return queryset.filter(delivery_crew=user)
         else:
-            return Order.objects.filter(user=user)
+            return queryset.filter(user=user)
 
+    @retry_on_locked
     def post(self, request, *args, **kwargs):
         user = request.user
-        cart_items = Cart.objects.filter(user=user)
 
-        with transaction.atomic():
-            if not cart_items.exists():
+        # The cart store writes the cart back to the Cart table first and
+        # holds it until the order is placed.
+        with carts.get_store().checkout(user), transaction.atomic():
+            # A single locked snapshot of the cart drives the order lines, the
+            # total and the cleanup, so a concurrent cart edit can neither slip
+            # into the order nor be deleted unseen.
+            cart_items = list(
+                Cart.objects.select_for_update(of=('self',)).select_related('menuitem__category').filter(user=user)
+            )
+            if not cart_items:
                 return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
 
             total = sum(item.unit_price * item.quantity for item in cart_items)
-            order = Order.objects.create(user=user, total=total, status=None)
-
+            order = Order(user=user, total=total, status=None)
             order_items = [
                 OrderItem(
                     order=order,
@@ -274,33 +422,43 @@ class OrderView(generics.ListCreateAPIView):
                     price=item.unit_price * item.quantity
                 ) for item in cart_items
             ]
+            summaries.summarize(order, order_items)
+            order.save()
+
             OrderItem.objects.bulk_create(order_items)
+            rollups.record_order(order, order_items)
+
+            Cart.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
 
-            cart_items.delete()
-            return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
     
 class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    unsummarized_lookups = OrderListSerializer.unsummarized_lookups
 
     def get_queryset(self):
         return Order.objects.all()
 
     def get_object(self):
         order = super().get_object()
+        self.check_order_access(order)
+        if order.lines is None:
+            # Not summarized yet, so OrderSerializer reads the related rows.
+            prefetch_related_objects([order], *self.unsummarized_lookups)
+        return order
+
+    def check_order_access(self, order):
         user = self.request.user
+        roles = get_roles(user)
 
-        if user.groups.filter(name="manager").exists():
-            return order
-        elif user.groups.filter(name="delivery-crew").exists():
-            if order.delivery_crew == user:
-                return order
-            else:
+        if MANAGER in roles:
+            return
+        elif DELIVERY_CREW in roles:
+            if order.delivery_crew_id != user.pk:
                 self.permission_denied(self.request)
         else:
-            if order.user == user:
-                return order
-            else:
+            if order.user_id != user.pk:
                 self.permission_denied(self.request)
 
     def patch(self, request, *args, **kwargs):
@@ -308,27 +466,29 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
         user = request.user
         data = request.data
 
+        roles = get_roles(user)
+
         def is_unassigned(value):
             return isinstance(value, str) and value.strip().lower() == "unassigned"
 
-        if user.groups.filter(name="manager").exists():
+        if MANAGER in roles:
             if 'delivery_crew' in data:
                 if is_unassigned(data['delivery_crew']):
-                    order.delivery_crew = None
+                    summaries.assign(order, None)
                     order.status = None
                 else:
                     try:
                         crew_user = User.objects.get(username=data['delivery_crew'])
-                        if not crew_user.groups.filter(name="delivery-crew").exists():
+                        if not in_group(crew_user, DELIVERY_CREW):
                             return Response({'error': 'User is not delivery crew.'}, status=400)
-                        order.delivery_crew = crew_user
+                        summaries.assign(order, crew_user)
                     except User.DoesNotExist:
                         return Response({'error': 'User not found.'}, status=404)
 
             if 'status' in data:
                 status_value = data['status']
                 if is_unassigned(status_value):
-                    order.delivery_crew = None
+                    summaries.assign(order, None)
                     order.status = None
                 elif str(status_value) in ['0', '1']:
                     order.status = int(status_value)
@@ -338,8 +498,8 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
             order.save()
             return Response(OrderSerializer(order).data)
 
-        elif user.groups.filter(name="delivery-crew").exists():
-            if order.delivery_crew != user:
+        elif DELIVERY_CREW in roles:
+            if order.delivery_crew_id != user.pk:
                 return Response({"error": "Not assigned to this order."}, status=403)
             if 'status' in data and str(data['status']) in ['0', '1']:
                 order.status = int(data['status'])
@@ -354,6 +514,218 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
         return self.partial_update(request, *args, **kwargs) 
 
     def delete(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="manager").exists():
+        if not in_group(request.user, MANAGER):
             return Response({'error': 'Only managers can delete orders.'}, status=403)
-        return super().delete(request, *args, **kwargs)
+
+        with transaction.atomic():
+            self.get_object().delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class OrderDispatchView(APIView):
+    """
+    Assigns many orders to delivery crew in one transaction.
+
+    In manual mode the body lists ``assignments`` of order id and crew
+    username. In auto mode the oldest unassigned, undelivered orders (or just
+    those in ``orders``) are spread over the crew (or just those in
+    ``delivery_crew``), each going to whoever has the fewest open orders.
+    Either way the crew and their load come from one aggregate query and
+    all orders are written with one bulk_update.
+    """
+    permission_classes = [IsManager]
+
+    @retry_on_locked
+    def post(self, request, *args, **kwargs):
+        params = OrderDispatchSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        with transaction.atomic():
+            if data['mode'] == 'manual':
+                wanted = {assignment['order']: assignment['delivery_crew'] for assignment in data['assignments']}
+                crew = self.get_crew(set(wanted.values()))
+                unknown = sorted(set(wanted.values()) - set(crew))
+                if unknown:
+                    return Response({'error': f'Not delivery crew: {", ".join(unknown)}.'}, status=400)
+
+                orders = list(Order.objects.select_for_update().filter(pk__in=wanted).order_by('pk'))
+                missing = sorted(set(wanted) - {order.pk for order in orders})
+                if missing:
+                    return Response({'error': f'Orders not found: {", ".join(map(str, missing))}.'}, status=404)
+                delivered = [str(order.pk) for order in orders if order.status == 1]
+                if delivered:
+                    return Response({'error': f'Orders already delivered: {", ".join(delivered)}.'}, status=400)
+
+                for order in orders:
+                    summaries.assign(order, crew[wanted[order.pk]])
+            else:
+                crew = self.get_crew(data.get('delivery_crew'))
+                unknown = sorted(set(data.get('delivery_crew', ())) - set(crew))
+                if unknown:
+                    return Response({'error': f'Not delivery crew: {", ".join(unknown)}.'}, status=400)
+                if not crew:
+                    return Response({'error': 'No delivery crew to dispatch to.'}, status=400)
+
+                # Delivered orders can be unassigned later (see OrderStatusView);
+                # like manual mode, never hand them out again.
+                orders = Order.objects.select_for_update().filter(delivery_crew__isnull=True).exclude(status=1)
+                if 'orders' in data:
+                    orders = orders.filter(pk__in=data['orders'])
+                orders = list(orders.order_by('date', 'pk')[:params.max_batch_size])
+                self.balance(orders, crew.values())
+
+            for order in orders:
+                order.status = 0
+            if orders:
+                Order.objects.bulk_update(orders, summaries.CREW_FIELDS + ['status'])
+
+        return Response({
+            'assigned': len(orders),
+            'assignments': [
+                {'order': order.pk, 'delivery_crew': order.delivery_crew.username} for order in orders
+            ],
+        })
+
+    def get_crew(self, usernames=None):
+        """Delivery crew by username, each annotated with its open (undelivered) order count."""
+        crew = User.objects.filter(groups__name=DELIVERY_CREW)
+        if usernames is not None:
+            crew = crew.filter(username__in=usernames)
+        crew = crew.annotate(open_orders=Count(
+            'delivery_crew', filter=Q(delivery_crew__status=0) | Q(delivery_crew__status__isnull=True)
+        ))
+        return {member.username: member for member in crew}
+
+    def balance(self, orders, crew):
+        # Ties go to the lowest user id, so the same load always dispatches
+        # the same way.
+        heap = [(member.open_orders, member.pk, member) for member in crew]
+        heapq.heapify(heap)
+        for order in orders:
+            load, pk, member = heap[0]
+            summaries.assign(order, member)
+            heapq.heapreplace(heap, (load + 1, pk, member))
+
+
+class OrderStatusView(APIView):
+    """
+    Moves many orders to one status with a single filtered UPDATE.
+
+    The rules match OrderDetailView.patch: delivery crew may only set 0 or 1
+    on orders assigned to them, managers may change any order and may also
+    send "unassigned". Orders the user may not change are skipped, so the
+    response reports how many of the requested orders were updated.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @retry_on_locked
+    def post(self, request, *args, **kwargs):
+        params = OrderStatusSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        ids = set(params.validated_data['orders'])
+        target = params.validated_data['status']
+
+        roles = get_roles(request.user)
+        orders = Order.objects.filter(pk__in=ids)
+        if MANAGER in roles:
+            if target == 'unassigned':
+                updated = orders.update(status=None, **summaries.crew_values(None))
+            else:
+                updated = orders.update(status=int(target))
+        elif DELIVERY_CREW in roles:
+            if target == 'unassigned':
+                return Response({'error': 'Only managers can unassign orders.'}, status=403)
+            updated = orders.filter(delivery_crew=request.user).update(status=int(target))
+        else:
+            return Response({"error": "Unauthorized."}, status=403)
+
+        return Response({'status': target, 'requested': len(ids), 'updated': updated})
+
+
+class OrderExportView(APIView):
+    permission_classes = [IsManager]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    chunk_size = 500
+    csv_fields = [
+        'order_id', 'date', 'customer', 'delivery_crew', 'status', 'total',
+        'menuitem', 'category', 'quantity', 'unit_price', 'price',
+    ]
+
+    def get(self, request, *args, **kwargs):
+        # (date, id) is the order of the date and (status, date) indexes, so a
+        # date range is read from the index without a sort.
+        orders = OrderFilterBackend().filter_queryset(request, Order.objects.all(), self)
+        orders = orders.order_by('date', 'pk')
+
+        renderer = request.accepted_renderer
+        if renderer.format == 'csv':
+            content = renderer.render_rows(self.csv_rows(orders), self.csv_fields)
+        else:
+            content = (renderer.render_row(row) for row in self.json_rows(orders))
+
+        response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="orders.{renderer.format}"'
+        return response
+
+    def json_rows(self, orders):
+        # Summarized orders need nothing beyond their own row, and iterator()
+        # fetches one chunk at a time, so memory stays flat however many
+        # orders match.
+        rows = OrderValuesSerializer.values(orders).iterator(chunk_size=self.chunk_size)
+        while chunk := list(islice(rows, self.chunk_size)):
+            yield from OrderValuesSerializer(chunk, many=True).data
+
+    def csv_rows(self, orders):
+        for order in self.json_rows(orders):
+            crew = order['delivery_crew']
+            row = {
+                'order_id': order['id'],
+                'date': order['date'],
+                'customer': order['customer']['username'],
+                'delivery_crew': '' if crew == UNASSIGNED else crew['username'],
+                'status': '' if order['status'] is None else order['status'],
+                'total': order['total'],
+            }
+            if not order['items']:
+                yield row
+            for item in order['items']:
+                yield dict(
+                    row,
+                    menuitem=item['menuitem']['title'],
+                    category=item['menuitem']['category'],
+                    quantity=item['quantity'],
+                    unit_price=item['unit_price'],
+                    price=item['price'],
+                )
+
+
+class SalesReportView(APIView):
+    permission_classes = [IsManager]
+    group_by_fields = {
+        'day': (['date'], {}),
+        'menuitem': (['menuitem_id'], {'title': F('menuitem__title')}),
+        'category': ([], {'category_id': F('menuitem__category_id'), 'title': F('menuitem__category__title')}),
+    }
+
+    def get(self, request, *args, **kwargs):
+        params = SalesReportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        # Reads only the DailySales rollups (plus menu names), never orders.
+        group_by = params.validated_data['group_by']
+        fields, expressions = self.group_by_fields[group_by]
+        rows = params.filter_queryset(DailySales.objects.all()) \
+            .values(*fields, **expressions) \
+            .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'), orders=Sum('orders')) \
+            .order_by(*fields, *expressions)
+        revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+        return Response([dict(row, revenue=revenue.to_representation(row['revenue'])) for row in rows])
+
+
+class MetricsView(APIView):
+    """Request histograms for this worker process, in the Prometheus text format."""
+    permission_classes = [IsManager]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')